@@ -0,0 +1,90 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from . import cache, metrics, replicas
+
+
+class UserCache:
+    """Ограниченный по размеру LRU-кеш пользователей с временем жизни.
+
+    Ключ — (id пользователя, версия). Версия `user:<id>` хранится в
+    таблице ResourceVersion и сдвигается сигналом при любом сохранении
+    пользователя в той же транзакции, поэтому изменённая роль или
+    блокировка видны во всех процессах со следующего запроса. Проверка
+    стоит одного запроса по первичному ключу вместо чтения пользователя.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            user, expires = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+        # Копия, чтобы изменения request.user в одном запросе
+        # не попадали в другие.
+        return copy.copy(user)
+
+    def set(self, key, user):
+        with self._lock:
+            self._items[key] = (copy.copy(user), time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+user_cache = UserCache(
+    max_size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, которая не читает пользователя из базы, пока
+    его версия не изменилась. Версия и сам пользователь читаются с
+    основной базы: реплика может отставать от блокировки. id из
+    проверенного токена передаётся в api.replicas, чтобы не проверять
+    токен второй раз."""
+
+    def authenticate(self, request):
+        try:
+            return super().authenticate(request)
+        except AuthenticationFailed as error:
+            codes = error.get_codes()
+            reason = codes if isinstance(codes, str) else 'token_not_valid'
+            metrics.registry.inc('yamdb_auth_failures_total', (reason,))
+            raise
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token)
+        replicas.authenticated(user_id)
+        key = (user_id, cache.get_primary_version(f'user:{user_id}'))
+        user = user_cache.get(key)
+        if user is None:
+            with replicas.primary():
+                user = super().get_user(validated_token)
+            user_cache.set(key, user)
+        return user
@@ -0,0 +1,193 @@
+"""Версии ресурсов, кеш ответов и условные GET-запросы.
+
+Каждый ресурс (`titles`, `reviews:<title_id>` и т.д.) имеет версию —
+метку времени его последнего изменения, которую выставляют сигналы
+моделей. Версии хранятся в базе (ResourceVersion) и меняются в той же
+транзакции, что и данные, поэтому все процессы видят одну версию.
+Строки версий создаёт и удаляет только запись: чтение их не создаёт. По
+версиям, URL и роли пользователя строится ETag, а по самой свежей
+версии — Last-Modified: проверка If-None-Match стоит одного запроса по
+первичному ключу и не требует сериализации.
+
+Закешированный ответ лежит под ключом из ETag: после изменения
+ресурса он становится недостижимым без перебора ключей. Версии для
+ключа берутся из базы, поэтому кеш ответов работает и с locmem — у
+каждого воркера своя копия, но устаревшую не отдаёт ни один. Кеш
+пользователей (authentication.py) сверяет версию пользователя с
+основной базой.
+"""
+import time
+from collections import Counter
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils.http import (
+    http_date, parse_etags, parse_http_date_safe, quote_etag
+)
+
+from reviews.models import ResourceVersion
+from . import metrics
+
+KEY_PREFIX = 'api:response'
+# Версия ресурса, который не менялся с последней миграции.
+UNCHANGED = 0
+# Старые сборки SQLite ограничивают число параметров запроса 999.
+FORGET_CHUNK_SIZE = 500
+
+# Ресурс -> ресурсы, ответы которых встраивают его данные.
+DEPENDENT_RESOURCES = {
+    'categories': ('categories', 'titles'),
+    'genres': ('genres', 'titles'),
+    'titles': ('titles',),
+    'reviews': ('titles',),
+    'users': ('users',),
+    'authors': ('authors',),
+}
+
+stats = Counter()
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def responses_enabled():
+    return getattr(settings, 'API_CACHE_RESPONSES', False)
+
+
+def _now():
+    return time.time_ns() // 1000
+
+
+def get_versions(resources):
+    """Версии ресурсов одним запросом к той же базе, что и данные
+    ответа: с реплики версии приходят вместе с данными, и ETag
+    отстающей реплики описывает её же данные, а не новые.
+
+    Чтение ничего не записывает: строку версии создаёт первое изменение
+    ресурса, до него версия постоянна (UNCHANGED). Поэтому вложенные
+    ресурсы проверяются только после того, как найден их родитель
+    (NestedResourceMixin): иначе удалённый ресурс совпал бы со старым
+    ETag.
+    """
+    found = dict(
+        ResourceVersion.objects.filter(resource__in=resources)
+        .values_list('resource', 'version')
+    )
+    return tuple(found.get(resource, UNCHANGED) for resource in resources)
+
+
+def get_primary_version(resource):
+    """Версия одного ресурса с основной базы — для проверок, которые не
+    должны отставать вместе с репликой (роль и блокировка
+    пользователя)."""
+    version = (
+        ResourceVersion.objects.using(DEFAULT_DB_ALIAS)
+        .filter(pk=resource).values_list('version', flat=True).first()
+    )
+    return UNCHANGED if version is None else version
+
+
+def invalidate(resource):
+    """Сдвигает версии ресурса и зависящих от него ресурсов одним
+    UPDATE: версия только растёт, даже если часы отстали."""
+    dependents = DEPENDENT_RESOURCES.get(resource, (resource,))
+    now = _now()
+    versions = ResourceVersion.objects.filter(resource__in=dependents)
+    updated = versions.update(version=Greatest(F('version') + 1, now))
+    if updated < len(dependents):
+        ResourceVersion.objects.bulk_create(
+            [ResourceVersion(dependent, now) for dependent in dependents],
+            ignore_conflicts=True,
+        )
+
+
+def forget(*resources):
+    """Удаляет версии ресурсов, которых больше нет (отзывы удалённого
+    произведения): id не используются повторно, а таблица версий не
+    должна расти с каждым удалением."""
+    for start in range(0, len(resources), FORGET_CHUNK_SIZE):
+        ResourceVersion.objects.filter(
+            resource__in=resources[start:start + FORGET_CHUNK_SIZE]
+        ).delete()
+
+
+def invalidate_all():
+    for resource in DEPENDENT_RESOURCES:
+        invalidate(resource)
+
+
+def auth_state(request):
+    """Часть состояния авторизации, от которой может зависеть ответ."""
+    user = request.user
+    if not user or not user.is_authenticated:
+        return 'anonymous'
+    if user.is_superuser or user.is_staff:
+        return 'staff'
+    return user.role
+
+
+def make_etag(request, versions):
+    state = '|'.join((
+        request.build_absolute_uri(),
+        auth_state(request),
+        *map(str, versions),
+    ))
+    return quote_etag(md5(state.encode()).hexdigest())
+
+
+def last_modified(versions):
+    """Время последнего изменения с точностью до секунды, как в HTTP;
+    None, если ресурсы не менялись с последней миграции."""
+    latest = max(versions)
+    if latest == UNCHANGED:
+        return None
+    return latest // 1_000_000
+
+
+def not_modified(request, etag, modified):
+    """Совпадает ли валидатор клиента с текущим. `If-None-Match: *`
+    здесь не учитывается: он совпадает только с существующим ответом
+    (matches_any)."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return etag in parse_etags(if_none_match)
+    if_modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+    )
+    return (
+        if_modified_since is not None and modified is not None
+        and modified <= if_modified_since
+    )
+
+
+def matches_any(request):
+    return '*' in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+
+def set_validators(response, etag, modified):
+    response['ETag'] = etag
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified)
+
+
+def get_response_data(key, resource):
+    data = get_cache().get(key)
+    result = 'hit' if data is not None else 'miss'
+    stats[(resource, result)] += 1
+    metrics.registry.inc('yamdb_response_cache_total', (resource, result))
+    return data
+
+
+def set_response_data(key, data):
+    get_cache().set(
+        key, data, getattr(settings, 'API_CACHE_TIMEOUT', 60 * 60)
+    )
+
+
+def response_key(resource, etag):
+    return f'{KEY_PREFIX}:{resource}:{etag}'
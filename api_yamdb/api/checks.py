@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Бэкенды, данные которых видны только текущему процессу.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_replica_pin_cache(app_configs, **kwargs):
+    """Отметка «читать с основной базы» после записи пользователя
+    хранится в DATABASE_PIN_CACHE; в кеше процесса её не видят другие
+    воркеры, и автор может не увидеть свою запись."""
+    if not getattr(settings, 'DATABASE_REPLICAS', ()):
+        return []
+    alias = getattr(settings, 'DATABASE_PIN_CACHE', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [Warning(
+        f'DATABASE_REPLICAS заданы, но кеш DATABASE_PIN_CACHE {alias!r} '
+        f'({backend}) не общий для процессов.',
+        hint=(
+            'Настройте общий кеш (memcached, redis) в DATABASE_PIN_CACHE, '
+            'иначе после записи в одном воркере другие читают с реплики.'
+        ),
+        id='api.W001',
+    )]
@@ -1,6 +1,8 @@
 from django_filters import rest_framework, FilterSet
+from rest_framework.filters import BaseFilterBackend
 
 from reviews import models
+from reviews.search import search_titles
 
 
 class TitleFilter(FilterSet):
@@ -22,3 +24,14 @@ class TitleFilter(FilterSet):
             'category__slug',
             'year',
         )
+
+
+class TitleSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по названию и описанию с ранжированием."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return search_titles(queryset, text)
@@ -0,0 +1,188 @@
+"""Замер SQL, сериализации и рендеринга для каждого запроса.
+
+Включается настройкой API_TIMING_ENABLED. Выключенный middleware
+исключается из цепочки через MiddlewareNotUsed, а обёртка сериализатора
+не устанавливается, так что накладных расходов нет. Результаты уходят в
+заголовок Server-Timing и в приёмники из API_TIMING_SINKS.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.module_loading import import_string
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger('api.timing')
+
+_current = ContextVar('api_request_timing', default=None)
+
+
+class RequestTiming:
+    """Замеры одного запроса; длительности в секундах."""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.view = None
+        self.status = None
+        self.queries = 0
+        self.sql = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.total = 0.0
+        self._render_started = None
+        self._serializer_depth = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self):
+        return ', '.join((
+            f'db;dur={self.sql * 1000:.1f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize * 1000:.1f}',
+            f'render;dur={self.render * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ))
+
+    def as_dict(self):
+        return {
+            'method': self.method,
+            'path': self.path,
+            'view': self.view,
+            'status': self.status,
+            'queries': self.queries,
+            'sql_ms': round(self.sql * 1000, 3),
+            'serialize_ms': round(self.serialize * 1000, 3),
+            'render_ms': round(self.render * 1000, 3),
+            'total_ms': round(self.total * 1000, 3),
+        }
+
+
+def current_timing():
+    return _current.get()
+
+
+@contextmanager
+def serialization_timer():
+    """Засчитывает блок во время сериализации текущего запроса;
+    вложенные блоки не удваивают время."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    timing._serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing._serializer_depth -= 1
+        if not timing._serializer_depth:
+            timing.serialize += time.perf_counter() - started
+
+
+_serializer_patch_lock = threading.Lock()
+_serializer_patched = False
+
+
+def _install_serializer_timing():
+    """Оборачивает BaseSerializer.data замером времени. Вложенные
+    сериализаторы не вызывают .data, поэтому время не удваивается."""
+    global _serializer_patched
+    with _serializer_patch_lock:
+        if _serializer_patched:
+            return
+        original = BaseSerializer.data
+
+        def data(serializer):
+            with serialization_timer():
+                return original.fget(serializer)
+
+        BaseSerializer.data = property(data)
+        _serializer_patched = True
+
+
+def view_name(view_func, method):
+    """`TitleViewSet.list` для вьюсетов, имя класса или функции иначе."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', None)
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+class LogSink:
+    """Пишет замеры строкой JSON в логгер `api.timing`."""
+
+    def __call__(self, timing):
+        logger.info(json.dumps(timing.as_dict(), ensure_ascii=False))
+
+
+class RingBufferSink:
+    """Хранит последние API_TIMING_BUFFER_SIZE замеров в памяти процесса."""
+    buffer = deque(maxlen=getattr(settings, 'API_TIMING_BUFFER_SIZE', 1000))
+
+    def __call__(self, timing):
+        self.buffer.append(timing.as_dict())
+
+
+class TimingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'API_TIMING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sinks = [
+            import_string(path)()
+            for path in getattr(settings, 'API_TIMING_SINKS', ())
+        ]
+        _install_serializer_timing()
+
+    def __call__(self, request):
+        timing = RequestTiming(request.method, request.path)
+        token = _current.set(timing)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timing.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        timing.total = time.perf_counter() - started
+        timing.status = response.status_code
+        response['Server-Timing'] = timing.server_timing()
+        for sink in self.sinks:
+            sink(timing)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = _current.get()
+        if timing is not None:
+            timing.view = view_name(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        timing = _current.get()
+        if timing is not None:
+            timing._render_started = time.perf_counter()
+            response.add_post_render_callback(self._rendered(timing))
+        return response
+
+    @staticmethod
+    def _rendered(timing):
+        def callback(response):
+            timing.render += time.perf_counter() - timing._render_started
+        return callback
@@ -0,0 +1,107 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import Http404
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from api.urls import router_v1
+from reviews.models import Review
+
+# Дополнительные варианты query-параметров, которыми клиенты
+# фильтруют списки. Значения не обязаны существовать в базе:
+# план запроса от них не зависит.
+LIST_PARAMS = {
+    'titles': (
+        {'year': '2000'},
+        {'category': 'movie'},
+        {'genre': 'drama'},
+        {'year': '2000', 'category': 'movie'},
+    ),
+}
+
+# Полный просмотр таблицы опасен для отфильтрованного списка, а для
+# нефильтрованного (где без просмотра не обойтись) — сортировка всех
+# строк вместо чтения в порядке индекса.
+FULL_SCAN = re.compile(r'\bSeq Scan on\b|\bSCAN (TABLE )?\w+$')
+FULL_SORT = re.compile(r'\bTEMP B-TREE FOR ORDER BY\b|\bSort\b')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для запросов списков каждого вьюсета '
+        'и отмечает полные просмотры таблиц'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Завершиться с ошибкой, если запрос не использует индекс',
+        )
+
+    def handle(self, *args, **options):
+        route_kwargs = self.route_kwargs()
+        flagged = []
+        seen = set()
+        for prefix, viewset, basename in router_v1.registry:
+            if basename in seen:
+                continue
+            seen.add(basename)
+            for params in ({},) + LIST_PARAMS.get(basename, ()):
+                label = basename + (f' {params}' if params else '')
+                if self.check_plan(label, viewset, params, route_kwargs):
+                    flagged.append(label)
+        if not flagged:
+            self.stdout.write(self.style.SUCCESS(
+                'Все запросы списков используют индексы'
+            ))
+        elif options['strict']:
+            raise CommandError(
+                'Запросы без подходящего индекса: ' + ', '.join(flagged)
+            )
+
+    def check_plan(self, label, viewset, params, route_kwargs):
+        """Печатает план запроса и возвращает True, если он без индекса."""
+        try:
+            queryset = self.list_queryset(viewset, params, route_kwargs)
+        except Http404:
+            self.stdout.write(f'{label}: нет данных, пропущен')
+            return False
+        if queryset is None:
+            return False
+        plan = queryset.explain()
+        pattern = FULL_SCAN if queryset.query.where else FULL_SORT
+        scans = [
+            line.strip() for line in plan.splitlines()
+            if pattern.search(line.strip())
+        ]
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(plan)
+        for line in scans:
+            self.stdout.write(self.style.WARNING(f'  без индекса: {line}'))
+        return bool(scans)
+
+    @staticmethod
+    def route_kwargs():
+        """Идентификаторы для вложенных маршрутов отзывов и комментариев."""
+        review = Review.objects.order_by().values('id', 'title_id').first()
+        if review is None:
+            return {'title_id': 0, 'review_id': 0}
+        return {'title_id': review['title_id'], 'review_id': review['id']}
+
+    @staticmethod
+    def list_queryset(viewset, params, route_kwargs):
+        if not hasattr(viewset, 'list'):
+            return None
+        request = Request(RequestFactory().get('/', params))
+        view = viewset(
+            request=request,
+            kwargs=route_kwargs,
+            args=(),
+            format_kwarg=None,
+            action='list',
+        )
+        queryset = view.filter_queryset(view.get_queryset())
+        return queryset[:api_settings.PAGE_SIZE]
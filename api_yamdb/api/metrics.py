@@ -0,0 +1,403 @@
+"""Метрики в текстовом формате Prometheus.
+
+Каждый процесс копит счётчики и гистограммы в памяти. Если задан
+METRICS_DIR, процесс раз в METRICS_FLUSH_INTERVAL секунд (и при выходе)
+сбрасывает их в собственный файл каталога, а /metrics складывает файлы
+всех процессов — так воркеры gunicorn отдают общую картину, как в
+multiprocess-режиме prometheus_client. Файлы завершившихся процессов
+/metrics складывает в archive.json, чтобы счётчики не убывали, а каталог
+не рос. Значения, которые дешевле посчитать в момент опроса (длина
+очереди писем), собираются там же.
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, suppress
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+
+try:
+    import fcntl
+except ImportError:  # Windows: файлы завершившихся процессов не архивируются
+    fcntl = None
+
+logger = logging.getLogger('api.metrics')
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+ARCHIVE = 'archive.json'
+ARCHIVE_LOCK = 'archive.lock'
+
+HELP = {
+    'yamdb_http_requests_total': ('counter', 'Запросы по маршрутам'),
+    'yamdb_http_request_duration_seconds': (
+        'histogram', 'Время ответа по маршрутам'
+    ),
+    'yamdb_db_queries_per_request': (
+        'histogram', 'SQL-запросов на один HTTP-запрос'
+    ),
+    'yamdb_response_cache_total': (
+        'counter', 'Попадания и промахи кеша ответов'
+    ),
+    'yamdb_auth_failures_total': ('counter', 'Неудачные аутентификации'),
+    'yamdb_signups_total': ('counter', 'Регистрации пользователей'),
+    'yamdb_mail_queue_depth': ('gauge', 'Писем в очереди на отправку'),
+}
+
+
+def _directory():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def _as_snapshot(counters, histograms):
+    return {
+        'counters': [
+            [name, list(labels), value]
+            for (name, labels), value in counters.items()
+        ],
+        'histograms': [
+            [name, list(labels), dict(histogram,
+                                      counts=histogram['counts'][:])]
+            for (name, labels), histogram in histograms.items()
+        ],
+    }
+
+
+def _write_json(path, data):
+    """Атомарно заменяет файл: уникальное временное имя, затем rename.
+    Префикс с pid позволяет убрать временный файл упавшего процесса."""
+    descriptor, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=f'{os.getpid()}-', suffix='.tmp'
+    )
+    try:
+        with os.fdopen(descriptor, 'w') as output:
+            json.dump(data, output)
+        os.replace(temporary, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(temporary)
+        raise
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self._flushed = time.monotonic()
+        # Путь к файлу снимка считается при первом сбросе в каждом
+        # процессе: при gunicorn --preload модуль импортирует мастер,
+        # и pid на момент импорта чужой для воркеров.
+        self._pid = None
+        self._path = None
+        atexit.register(self.flush)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forget_parent)
+
+    def _forget_parent(self):
+        # Значения родителя попадут в его собственный файл, а его замок
+        # мог остаться захваченным в момент fork.
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, tuple(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    'buckets': list(buckets),
+                    'counts': [0] * len(buckets),
+                    'sum': 0,
+                    'count': 0,
+                }
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][index] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return _as_snapshot(self.counters, self.histograms)
+
+    def own_path(self, directory):
+        """Файл снимка текущего процесса в каталоге directory."""
+        pid = os.getpid()
+        if (self._pid != pid
+                or os.path.dirname(self._path) != directory):
+            self._pid = pid
+            self._path = os.path.join(
+                directory, f'{pid}-{time.time_ns()}.json'
+            )
+        return self._path
+
+    def maybe_flush(self):
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1)
+        if not _directory():
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._flushed < interval:
+                return
+            self._flushed = now
+        self.flush()
+
+    def flush(self):
+        """Сбрасывает снимок в файл процесса. Ошибки ввода-вывода только
+        пишутся в лог: из-за метрик запрос не должен падать."""
+        directory = _directory()
+        if not directory:
+            return
+        self._flushed = time.monotonic()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            _write_json(self.own_path(directory), self.snapshot())
+        except OSError:
+            logger.warning('Не удалось сохранить метрики', exc_info=True)
+
+    def collect(self):
+        """Снимки всех процессов: из файлов каталога и свой из памяти."""
+        snapshots = [self.snapshot()]
+        directory = _directory()
+        if not directory:
+            return snapshots
+        own = self.own_path(directory)
+        try:
+            _archive_dead(directory, own)
+            filenames = os.listdir(directory)
+        except OSError:
+            logger.warning('Не удалось прочитать метрики', exc_info=True)
+            return snapshots
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if not filename.endswith('.json') or path == own:
+                continue
+            snapshot = _read_snapshot(path)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_dead(filename, own):
+    """Файл процесса, который завершился. Свой pid в чужом имени —
+    файл прежнего процесса, чей pid достался нам."""
+    pid = filename.split('-', 1)[0]
+    if filename == own or not pid.isdigit():
+        return False
+    if int(pid) == os.getpid():
+        return True
+    return not _process_exists(int(pid))
+
+
+def _archive_dead(directory, own):
+    """Складывает снимки завершившихся процессов в archive.json и
+    удаляет их файлы.
+
+    Каталог должен быть локальным для узла: pid процессов другого узла
+    или контейнера отсюда не видны, и их файлы сочлись бы мёртвыми.
+    """
+    if fcntl is None:
+        return
+    own = os.path.basename(own)
+    if not any(_is_dead(name, own) for name in os.listdir(directory)):
+        return
+    with open(os.path.join(directory, ARCHIVE_LOCK), 'a') as lock:
+        # Под замком: два опроса /metrics не сложат один файл дважды.
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        dead = [
+            name for name in os.listdir(directory) if _is_dead(name, own)
+        ]
+        snapshots = [
+            _read_snapshot(os.path.join(directory, name))
+            for name in [ARCHIVE] + dead if name.endswith('.json')
+        ]
+        counters, histograms = _merge(filter(None, snapshots))
+        _write_json(
+            os.path.join(directory, ARCHIVE),
+            _as_snapshot(counters, histograms),
+        )
+        for name in dead:
+            with suppress(FileNotFoundError):
+                os.unlink(os.path.join(directory, name))
+
+
+registry = Registry()
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+LABEL_NAMES = {
+    'yamdb_http_requests_total': ('route', 'method', 'status'),
+    'yamdb_http_request_duration_seconds': ('route',),
+    'yamdb_db_queries_per_request': ('route',),
+    'yamdb_response_cache_total': ('resource', 'result'),
+    'yamdb_auth_failures_total': ('reason',),
+    'yamdb_signups_total': (),
+    'yamdb_mail_queue_depth': ('state',),
+}
+
+
+def _merge(snapshots):
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, tuple(labels))
+            merged = histograms.setdefault(key, {
+                'buckets': histogram['buckets'],
+                'counts': [0] * len(histogram['buckets']),
+                'sum': 0,
+                'count': 0,
+            })
+            for index, count in enumerate(histogram['counts']):
+                merged['counts'][index] += count
+            merged['sum'] += histogram['sum']
+            merged['count'] += histogram['count']
+    return counters, histograms
+
+
+def _gauges():
+    from reviews.models import OutgoingEmail
+
+    pending = OutgoingEmail.objects.filter(failed=False).count()
+    failed = OutgoingEmail.objects.filter(failed=True).count()
+    return {
+        ('yamdb_mail_queue_depth', ('pending',)): pending,
+        ('yamdb_mail_queue_depth', ('failed',)): failed,
+    }
+
+
+def render():
+    counters, histograms = _merge(registry.collect())
+    values = dict(counters)
+    values.update(_gauges())
+    lines = []
+    for name, (kind, description) in HELP.items():
+        names = LABEL_NAMES[name]
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (metric, labels), value in sorted(values.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(names, labels)} {value}')
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(histogram['buckets'],
+                                    histogram['counts']):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(
+                    name,
+                    _labels(names + ('le',), labels + (bound,)),
+                    cumulative,
+                ))
+            lines.append('{}_bucket{} {}'.format(
+                name,
+                _labels(names + ('le',), labels + ('+Inf',)),
+                histogram['count'],
+            ))
+            lines.append(
+                f'{name}_sum{_labels(names, labels)} {histogram["sum"]}'
+            )
+            lines.append(
+                f'{name}_count{_labels(names, labels)} {histogram["count"]}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    return HttpResponse(
+        render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Время ответа и число SQL-запросов по именам маршрутов router_v1."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else 'unmatched'
+        if route == 'metrics':
+            return response
+        registry.inc(
+            'yamdb_http_requests_total',
+            (route, request.method, response.status_code),
+        )
+        registry.observe(
+            'yamdb_db_queries_per_request', (route,),
+            counter.count, QUERY_BUCKETS,
+        )
+        registry.observe(
+            'yamdb_http_request_duration_seconds', (route,),
+            duration, LATENCY_BUCKETS,
+        )
+        return response
@@ -1,10 +1,22 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.mixins import (
     CreateModelMixin,
     DestroyModelMixin,
     ListModelMixin
 )
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from reviews.models import Title
+from . import cache
+from .instrumentation import serialization_timer
+from .pagination import SizedPagination
+from .serializers import TitleReadOnlySerializer
+
 
 class CreateMixin(GenericViewSet, CreateModelMixin):
     pass
@@ -17,3 +29,278 @@ class CategoriesGenresMixin(
     DestroyModelMixin
 ):
     pass
+
+
+class ConditionalListMixin:
+    """Отвечает на list() с ETag и Last-Modified по версиям ресурсов
+    из `get_version_resources()` и возвращает 304 без сериализации, если
+    клиент прислал актуальный валидатор. При `cache_responses` и
+    включённой настройке API_CACHE_RESPONSES тело ответа кешируется под
+    ключом из этого ETag до следующего изменения ресурса."""
+    version_resource = None
+    cache_responses = False
+
+    def get_version_resources(self):
+        return (self.version_resource,)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        versions = cache.get_versions(self.get_version_resources())
+        etag = cache.make_etag(request, versions)
+        modified = cache.last_modified(versions)
+        if cache.not_modified(request, etag, modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        elif self.cache_responses and cache.responses_enabled():
+            response = self.cached_response(
+                handler, request, etag, *args, **kwargs
+            )
+        else:
+            response = handler(request, *args, **kwargs)
+        # `If-None-Match: *` совпадает с любым существующим ответом, но
+        # не с 404.
+        if response.status_code == 200 and cache.matches_any(request):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        if response.status_code in (200, 304):
+            cache.set_validators(response, etag, modified)
+        return response
+
+    def cached_response(self, handler, request, etag, *args, **kwargs):
+        # ETag построен по версиям из базы, одинаковым во всех процессах:
+        # после изменения ресурса старый ключ недостижим и в locmem
+        # любого воркера.
+        key = cache.response_key(self.version_resource, etag)
+        data = cache.get_response_data(key, self.version_resource)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set_response_data(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalListMixin):
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class NestedResourceMixin:
+    """Родительский объект вложенного маршрута.
+
+    Вся цепочка родителей из URL (например, произведение и отзыв для
+    комментариев) загружается одним запросом через select_related,
+    проверяется на согласованность и кешируется на вьюсете, чтобы
+    get_queryset, perform_create, get_object и права доступа не
+    запрашивали её повторно.
+    """
+    parent_model = None
+    # Поле родительской модели -> именованный аргумент URL.
+    parent_url_kwargs = {}
+    parent_related = ()
+    # Поле дочерней модели, указывающее на родителя.
+    parent_field = None
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            queryset = self.parent_model.objects.select_related(
+                *self.parent_related
+            )
+            self._parent = get_object_or_404(queryset, **{
+                field: self.kwargs.get(kwarg)
+                for field, kwarg in self.parent_url_kwargs.items()
+            })
+        return self._parent
+
+    def get_object(self):
+        obj = super().get_object()
+        setattr(obj, self.parent_field, self.get_parent())
+        return obj
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        # Версии вложенного ресурса может не быть в базе: сначала 404
+        # для удалённого родителя, потом сравнение ETag.
+        self.get_parent()
+        return super().conditional_response(
+            handler, request, *args, **kwargs
+        )
+
+    def perform_create(self, serializer):
+        serializer.save(
+            author=self.request.user,
+            **{self.parent_field: self.get_parent()}
+        )
+
+
+class SparseQuerysetMixin:
+    """Читает из базы только поля, которые попадут в ответ list() и
+    retrieve(): queryset сужается через only() по
+    `model_field_paths()` сериализатора (см. SparseFieldsMixin), а
+    ненужные select_related и prefetch_related снимаются.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.sparse_actions:
+            return queryset
+        serializer = self.get_serializer()
+        if not hasattr(serializer, 'model_field_paths'):
+            return queryset
+        return narrow_queryset(queryset, {
+            *serializer.model_field_paths(),
+            *self.get_sparse_required_fields(),
+        })
+
+    def get_sparse_required_fields(self):
+        """Поля, нужные вьюсету независимо от ответа: ключ курсора и
+        связь с родителем вложенного маршрута (менеджер связи читает её
+        у каждой загруженной строки)."""
+        fields = [
+            field.lstrip('-')
+            for field in getattr(self, 'cursor_ordering', ())
+        ]
+        parent_field = getattr(self, 'parent_field', None)
+        if parent_field:
+            fields.append(parent_field)
+        return fields
+
+
+class ValuesListMixin:
+    """list() по строкам `.values()`: если сериализатор умеет строить
+    ответ по строкам (ValuesRepresentationMixin), объекты моделей и
+    поля DRF для каждого объекта не создаются. JSON ответа совпадает
+    с обычной сериализацией; API_VALUES_SERIALIZATION = False
+    отключает этот путь.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        if (
+            not getattr(settings, 'API_VALUES_SERIALIZATION', True)
+            or not hasattr(serializer, 'values_columns')
+            or serializer.values_columns() is None
+        ):
+            return super().list(request, *args, **kwargs)
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .prefetch_related(None)
+            .values(*serializer.values_paths(), *self.get_row_fields())
+        )
+        page = self.paginate_queryset(rows)
+        if page is None:
+            rows = list(rows)
+        with serialization_timer():
+            data = serializer.represent_rows(rows if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def get_row_fields(self):
+        """Поля строки, нужные пагинации: ключ курсора."""
+        return [
+            field.lstrip('-')
+            for field in getattr(self, 'cursor_ordering', ())
+        ]
+
+
+def _is_column(model, path):
+    """Путь ведёт к столбцу модели или модели, связанной через FK."""
+    for name in path.split('__'):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        if not field.concrete or field.many_to_many:
+            return False
+        model = field.related_model
+    return True
+
+
+def narrow_queryset(queryset, paths):
+    """Оставляет в queryset только поля `paths` (пути через __) и
+    связи, через которые они идут."""
+    roots = {path.split('__')[0] for path in paths}
+    selected = queryset.query.select_related
+    if isinstance(selected, dict):
+        queryset = queryset.select_related(None).select_related(
+            *(relation for relation in selected if relation in roots)
+        )
+    prefetched = queryset._prefetch_related_lookups
+    queryset = queryset.prefetch_related(None).prefetch_related(
+        *(lookup for lookup in prefetched if lookup in roots)
+    )
+    return queryset.only(*(
+        path for path in paths if _is_column(queryset.model, path)
+    ))
+
+
+class RankedTitlesMixin:
+    """`/<группа>/<slug>/titles/` — произведения жанра или категории
+    из таблицы рейтингов `ranking_model`.
+
+    `?ordering=` принимает rating, weighted_rating, year и review_count,
+    с минусом — по убыванию (по умолчанию -rating); при равенстве
+    значений порядок задаёт id произведения. Страница выбирается по
+    индексу таблицы рейтингов, поэтому стоимость запроса не зависит от
+    размера каталога.
+    """
+    ranking_model = None
+    ranking_field = None
+    ranking_orderings = (
+        'rating', 'weighted_rating', 'year', 'review_count'
+    )
+    default_ranking_ordering = '-rating'
+
+    def get_version_resources(self):
+        if self.action == 'titles':
+            return ('titles',)
+        return super().get_version_resources()
+
+    def get_ranking_ordering(self):
+        ordering = self.request.query_params.get('ordering', '')
+        if ordering.lstrip('-') not in self.ranking_orderings:
+            ordering = self.default_ranking_ordering
+        direction = '-' if ordering.startswith('-') else ''
+        return ordering, f'{direction}title_id'
+
+    @action(detail=True, url_path='titles')
+    def titles(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.ranked_titles, request, *args, **kwargs
+        )
+
+    def ranked_titles(self, request, *args, **kwargs):
+        # Без filter_queryset: ?search= и другие фильтры списка групп не
+        # относятся к произведениям и не должны скрывать саму группу.
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        group = get_object_or_404(self.get_queryset(), **{
+            self.lookup_field: self.kwargs[lookup_url_kwarg]
+        })
+        self.check_object_permissions(request, group)
+        ranking = (
+            self.ranking_model.objects
+            .filter(**{self.ranking_field: group})
+            .order_by(*self.get_ranking_ordering())
+            .values_list('title_id', flat=True)
+        )
+        paginator = SizedPagination()
+        title_ids = paginator.paginate_queryset(ranking, request, view=self)
+        context = self.get_serializer_context()
+        titles = narrow_queryset(
+            Title.objects.select_related('category').prefetch_related('genre'),
+            TitleReadOnlySerializer(context=context).model_field_paths(),
+        ).in_bulk(title_ids)
+        serializer = TitleReadOnlySerializer(
+            [titles[title_id] for title_id in title_ids if title_id in titles],
+            many=True,
+            context=context,
+        )
+        return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,227 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class UncountedPage:
+    """Страница без общего числа объектов: о следующей странице
+    известно по лишней строке, выбранной сверх размера страницы."""
+
+    def __init__(self, object_list, number, has_next):
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class SizedPagination(PageNumberPagination):
+    """Постраничная пагинация с размером страницы от клиента.
+
+    `?page_size=N` ограничен `max_page_size`. Если задан
+    `all_page_size`, `?page_size=all` (или 0) отдаёт до стольких
+    объектов одной страницей — для небольших справочников, ответы
+    которых кешируются. `?count=false` пропускает запрос COUNT(*):
+    в ответе `count` равен null, а наличие следующей страницы
+    определяется по лишней выбранной строке.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    all_page_size = None
+    all_page_size_values = ('all', '0')
+    count_query_param = 'count'
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if self.all_page_size and value in self.all_page_size_values:
+            return self.all_page_size
+        return super().get_page_size(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.with_count = request.query_params.get(
+            self.count_query_param, ''
+        ).lower() not in ('false', '0')
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        # Без COUNT номер последней страницы ('last') неизвестен.
+        number = request.query_params.get(self.page_query_param, 1)
+        try:
+            number = int(number)
+            if number < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message.format(
+                page_number=number, message='Неверный номер страницы.'
+            ))
+        offset = (number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if not rows and number > 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=number, message='Страница пуста.'
+            ))
+        self.page = UncountedPage(
+            rows[:page_size], number, has_next=len(rows) > page_size
+        )
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.with_count:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': None,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class LookupPagination(SizedPagination):
+    """Для жанров и категорий: весь справочник одной страницей."""
+    all_page_size = 1000
+
+
+class OptionalCursorPagination(SizedPagination):
+    """Постраничная пагинация с включаемым режимом keyset-курсора.
+
+    По умолчанию работает как SizedPagination. С параметром
+    `?pagination=cursor` страница выбирается условием WHERE по полям
+    `cursor_ordering` вьюсета вместо OFFSET и без запроса COUNT(*),
+    поэтому стоимость страницы не зависит от её глубины.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = view.cursor_ordering
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results and (reverse or has_more):
+            self.next_position = self.position_of(results[-1])
+        if results and (has_more if reverse else position is not None):
+            self.previous_position = self.position_of(results[0])
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.encode_cursor(self.next_position, reverse=False),
+            'previous': self.encode_cursor(
+                self.previous_position, reverse=True
+            ),
+            'results': data,
+        })
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def after(ordering, position):
+        """Условие «строго после позиции» для составного ключа:
+        (a > x) OR (a = x AND b > y) OR ..."""
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            for prev_field, value in zip(ordering[:index], position):
+                step &= Q(**{prev_field.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def position_of(self, instance):
+        # isoformat() сохраняет микросекунды, иначе сравнение по дате
+        # в курсоре перестанет совпадать со значением в базе.
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            # Строки .values() приходят словарями (см. ValuesListMixin).
+            if isinstance(instance, dict):
+                value = instance[name]
+            else:
+                value = getattr(instance, name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            position.append(value)
+        return position
+
+    def encode_cursor(self, position, reverse):
+        if position is None:
+            return None
+        payload = json.dumps({'p': position, 'r': reverse})
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        url = replace_query_param(url, self.mode_query_param, 'cursor')
+        return replace_query_param(
+            url, self.cursor_query_param,
+            urlsafe_b64encode(payload.encode()).decode()
+        )
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            values, reverse = payload['p'], bool(payload['r'])
+            position = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
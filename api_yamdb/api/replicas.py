@@ -0,0 +1,208 @@
+"""Чтение с реплик базы данных.
+
+Безопасные запросы (GET, HEAD, OPTIONS) к представлениям DRF читают
+с реплик из DATABASE_REPLICAS; остальное (админка, документация,
+/metrics) и любые записи идут в `default`.
+Реплика выбирается одна на запрос — по кругу или с наименьшей
+задержкой SQL. Версии ресурсов (ETag) читаются с той же реплики, что
+и данные, поэтому отставание реплики не смешивает новую версию со
+старыми данными, и каталог читается с реплик даже при постоянном
+потоке отзывов.
+
+После успешного изменяющего запроса пользователя его собственные
+запросы DATABASE_PIN_SECONDS секунд читают с основной базы (автор
+сразу видит свой отзыв). Отметка хранится в кеше DATABASE_PIN_CACHE и
+видна всем воркерам, только если этот кеш общий (memcached, redis);
+с locmem её видит лишь воркер, принявший запись (см. checks.py).
+"""
+import itertools
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+PIN_PREFIX = 'api:replica-pin'
+
+_state = threading.local()
+
+
+def replica_aliases():
+    return tuple(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def pin_seconds():
+    return getattr(settings, 'DATABASE_PIN_SECONDS', 5)
+
+
+def pin_cache_alias():
+    return getattr(settings, 'DATABASE_PIN_CACHE', 'default')
+
+
+def get_pin_cache():
+    return caches[pin_cache_alias()]
+
+
+def current_replica():
+    """Реплика, с которой читает текущий запрос, или None."""
+    return getattr(_state, 'alias', None)
+
+
+def use_primary():
+    """Переключает чтение до конца запроса на основную базу."""
+    _state.alias = None
+
+
+@contextmanager
+def primary():
+    """Читает с основной базы внутри блока."""
+    alias = current_replica()
+    _state.alias = None
+    try:
+        yield
+    finally:
+        _state.alias = alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return current_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему реплики получают от основной базы вместе с данными.
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class RoundRobinSelector:
+    def __init__(self, aliases):
+        self._aliases = itertools.cycle(aliases)
+        self._lock = threading.Lock()
+
+    def choose(self):
+        with self._lock:
+            return next(self._aliases)
+
+    def record(self, alias, seconds, queries):
+        pass
+
+
+class LeastLatencySelector:
+    """Реплика с наименьшей сглаженной задержкой одного SQL-запроса.
+    Ещё не опрошенные реплики выбираются первыми."""
+    smoothing = 0.2
+
+    def __init__(self, aliases):
+        self.latency = dict.fromkeys(aliases, 0.0)
+        self._lock = threading.Lock()
+
+    def choose(self):
+        with self._lock:
+            return min(self.latency, key=self.latency.get)
+
+    def record(self, alias, seconds, queries):
+        if not queries:
+            return
+        sample = seconds / queries
+        with self._lock:
+            previous = self.latency[alias]
+            self.latency[alias] = (
+                sample if not previous
+                else previous + self.smoothing * (sample - previous)
+            )
+
+
+SELECTORS = {
+    'round_robin': RoundRobinSelector,
+    'least_latency': LeastLatencySelector,
+}
+
+
+def _pin_key(user_id):
+    return f'{PIN_PREFIX}:{user_id}'
+
+
+def authenticated(user_id):
+    """Вызывается аутентификацией с id из уже проверенного токена.
+
+    Запоминает пользователя до конца запроса и, если он недавно что-то
+    изменил, переключает чтение на основную базу — до того, как
+    пользователь будет прочитан из базы.
+    """
+    _state.user_id = user_id
+    if current_replica() is not None and get_pin_cache().get(
+        _pin_key(user_id)
+    ):
+        use_primary()
+
+
+class _SQLTimer:
+    def __init__(self):
+        self.seconds = 0.0
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class ReplicaMiddleware:
+    """Выбирает базу для чтения на время запроса."""
+
+    def __init__(self, get_response):
+        aliases = replica_aliases()
+        if not aliases:
+            raise MiddlewareNotUsed
+        selection = getattr(
+            settings, 'DATABASE_REPLICA_SELECTION', 'round_robin'
+        )
+        self.selector = SELECTORS[selection](aliases)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.alias = _state.chosen = _state.user_id = None
+        timer = _SQLTimer()
+        try:
+            with ExitStack() as stack:
+                for alias in replica_aliases():
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(timer)
+                    )
+                response = self.get_response(request)
+        finally:
+            chosen, user_id = _state.chosen, _state.user_id
+            _state.alias = _state.chosen = _state.user_id = None
+        if chosen is not None:
+            self.selector.record(chosen, timer.seconds, timer.queries)
+        if (request.method not in SAFE_METHODS and user_id is not None
+                and response.status_code < 400):
+            get_pin_cache().set(_pin_key(user_id), True, pin_seconds())
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Реплики только для API: админка работает с сессией и сразу
+        # показывает свои изменения, /metrics считает очередь писем.
+        # Представления DRF узнаются по атрибуту cls от as_view(): импорт
+        # rest_framework.views отсюда замкнул бы цикл через
+        # DEFAULT_AUTHENTICATION_CLASSES.
+        if request.method in SAFE_METHODS and hasattr(view_func, 'cls'):
+            _state.alias = _state.chosen = self.selector.choose()
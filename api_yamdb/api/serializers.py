@@ -1,8 +1,13 @@
 from django.apps import apps
-from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueTogetherValidator
 
+from reviews.models import SCORE_COUNT_FIELDS
+from reviews.ratings import histogram_median, score_histogram
+
 
 Category = apps.get_model(app_label='reviews', model_name='Category')
 Comment = apps.get_model(app_label='reviews', model_name='Comment')
@@ -12,6 +17,155 @@ Title = apps.get_model(app_label='reviews', model_name='Title')
 User = apps.get_model(app_label='reviews', model_name='User')
 
 
+class SparseFieldsMixin:
+    """Выборочные поля в ответах на GET-запросы.
+
+    `?fields=id,name` оставляет только перечисленные поля, `?omit=text`
+    убирает перечисленные. Поля из `optional_fields` отдаются, только
+    если названы в `?include=` или `?fields=`. Выбор применяется к
+    корневому сериализатору, вложенные объекты отдаются целиком.
+    По оставшимся полям `model_field_paths()` сообщает, какие поля
+    модели читать из базы.
+    """
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+    include_query_param = 'include'
+    optional_fields = ()
+    # Поле сериализатора -> пути полей модели (через __), если их
+    # нельзя вывести из source.
+    field_sources = {}
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def _requested(self, param):
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        value = request.query_params.get(param)
+        if value is None:
+            return None
+        return {name.strip() for name in value.split(',')} - {''}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = omitted = None
+        if self._is_root():
+            selected = self._requested(self.fields_query_param)
+            omitted = self._requested(self.omit_query_param)
+        included = (
+            (self._requested(self.include_query_param) or set())
+            | (selected or set())
+        )
+        for name in list(fields):
+            if (
+                name in self.optional_fields and name not in included
+                or selected is not None and name not in selected
+                or omitted and name in omitted
+            ):
+                del fields[name]
+        return fields
+
+    def model_field_paths(self):
+        """Пути полей модели, которые читают выбранные поля."""
+        paths = set()
+        for name, field in self.fields.items():
+            if name in self.field_sources:
+                paths.update(self.field_sources[name])
+            elif field.source != '*':
+                paths.add(field.source.replace('.', '__'))
+        return paths
+
+
+def _values_column(field, prefix=''):
+    """(пути .values(), функция строки -> значение) для поля или None,
+    если поле нельзя построить по строке.
+
+    Значения проходят через to_representation тех же полей, поэтому
+    совпадают с обычной сериализацией объекта.
+    """
+    if isinstance(field, serializers.SlugRelatedField):
+        path = prefix + field.source.replace('.', '__')
+        slug = f'{path}__{field.slug_field}'
+        return (path, slug), lambda row: row[slug]
+    if isinstance(field, serializers.BaseSerializer):
+        if isinstance(field, serializers.ListSerializer):
+            return None
+        path = prefix + field.source.replace('.', '__')
+        columns = _values_columns(field.fields, f'{path}__')
+        if columns is None:
+            return None
+        paths = {path, *(
+            column_path for _, column_paths, _ in columns
+            for column_path in column_paths
+        )}
+        return tuple(paths), lambda row: None if row[path] is None else {
+            name: build(row) for name, _, build in columns
+        }
+    if field.source == '*' or isinstance(field, serializers.RelatedField):
+        return None
+    path = prefix + field.source.replace('.', '__')
+    represent = field.to_representation
+    return (path,), lambda row: (
+        None if row[path] is None else represent(row[path])
+    )
+
+
+def _values_columns(fields, prefix=''):
+    columns = []
+    for name, field in fields.items():
+        column = _values_column(field, prefix)
+        if column is None:
+            return None
+        columns.append((name, *column))
+    return columns
+
+
+class ValuesRepresentationMixin:
+    """Представление списка по строкам `.values()` без создания
+    объектов моделей и обхода полей сериализатора для каждого объекта.
+
+    Для поля `<имя>`, которое нельзя построить по строке (вложенный
+    список, SerializerMethodField), сериализатор может определить
+    `values_<имя>(field)`, возвращающий (пути, функция строки). Если
+    для какого-то поля нет ни того, ни другого, `values_columns()`
+    возвращает None и вьюсет сериализует объекты обычным путём.
+    """
+
+    def values_columns(self):
+        """[(имя поля, пути .values(), функция строки -> значение)]"""
+        if not hasattr(self, '_values_columns'):
+            columns = []
+            for name, field in self.fields.items():
+                custom = getattr(self, f'values_{name}', None)
+                column = custom(field) if custom else _values_column(field)
+                if column is None:
+                    columns = None
+                    break
+                columns.append((name, *column))
+            self._values_columns = columns
+        return self._values_columns
+
+    def values_paths(self):
+        return {
+            path for _, paths, _ in self.values_columns() for path in paths
+        }
+
+    def prepare_rows(self, rows):
+        """Дополняет строки данными, которые не выбрать в .values()."""
+
+    def represent_rows(self, rows):
+        self.prepare_rows(rows)
+        columns = self.values_columns()
+        return [
+            {name: build(row) for name, _, build in columns}
+            for row in rows
+        ]
+
+
 class UserCreationSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -38,7 +192,7 @@ class UserCreationSerializer(serializers.ModelSerializer):
         return value
 
 
-class UserSerializer(UserCreationSerializer):
+class UserSerializer(SparseFieldsMixin, UserCreationSerializer):
     class Meta:
         model = User
         fields = (
@@ -76,25 +230,37 @@ class TokenObtainSerializer(serializers.ModelSerializer):
         )
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для жанра"""
     class Meta:
         model = Genre
         exclude = ('id',)
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для категории"""
     class Meta:
         model = Category
         exclude = ('id',)
 
 
-class TitleReadOnlySerializer(serializers.ModelSerializer):
-    """Сериализатор для тайтлов на чтение"""
+class TitleReadOnlySerializer(
+    SparseFieldsMixin, ValuesRepresentationMixin, serializers.ModelSerializer
+):
+    """Сериализатор для тайтлов на чтение.
+
+    Поля из `optional_fields` отдаются, только если перечислены в
+    параметре запроса `include`, например
+    `?include=weighted_rating,score_histogram`.
+    """
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(read_only=True, many=True)
-    rating = serializers.FloatField()
+    score_histogram = serializers.SerializerMethodField()
+    optional_fields = ('weighted_rating', 'score_histogram')
+    field_sources = {
+        'category': ('category__name', 'category__slug'),
+        'score_histogram': tuple(SCORE_COUNT_FIELDS.values()),
+    }
 
     class Meta:
         fields = (
@@ -105,13 +271,77 @@ class TitleReadOnlySerializer(serializers.ModelSerializer):
             'category',
             'genre',
             'rating',
+            'weighted_rating',
+            'score_histogram',
         )
         read_only_fields = (
             'id',
             'rating',
+            'weighted_rating',
         )
         model = Title
 
+    def get_score_histogram(self, obj):
+        """Число отзывов с каждой оценкой от 1 до 10."""
+        return {
+            str(score): count
+            for score, count in score_histogram(obj).items()
+        }
+
+    def values_score_histogram(self, field):
+        return tuple(SCORE_COUNT_FIELDS.values()), lambda row: {
+            str(score): row[field_name]
+            for score, field_name in SCORE_COUNT_FIELDS.items()
+        }
+
+    def values_genre(self, field):
+        # Жанры всех строк выбираются одним запросом в prepare_rows.
+        self._genre_columns = _values_columns(field.child.fields, 'genre__')
+        return ('id',), lambda row: row['genre']
+
+    def prepare_rows(self, rows):
+        if 'genre' not in self.fields or not rows:
+            return
+        columns = self._genre_columns
+        genres = {row['id']: [] for row in rows}
+        ordering = [
+            f'-genre__{field[1:]}' if field.startswith('-')
+            else f'genre__{field}'
+            for field in Genre._meta.ordering
+        ]
+        links = (
+            Title.genre.through.objects
+            .filter(title_id__in=list(genres))
+            .order_by(*ordering)
+            .values('title_id', *(
+                path for _, paths, _ in columns for path in paths
+            ))
+        )
+        for link in links:
+            genres[link['title_id']].append({
+                name: build(link) for name, _, build in columns
+            })
+        for row in rows:
+            row['genre'] = genres[row['id']]
+
+
+class TitleStatsSerializer(serializers.Serializer):
+    """Статистика оценок произведения по его счётчикам."""
+    review_count = serializers.IntegerField()
+    mean = serializers.FloatField(source='rating')
+    weighted_mean = serializers.FloatField(source='weighted_rating')
+    median = serializers.SerializerMethodField()
+    histogram = serializers.SerializerMethodField()
+
+    def get_median(self, obj):
+        return histogram_median(score_histogram(obj))
+
+    def get_histogram(self, obj):
+        return {
+            str(score): count
+            for score, count in score_histogram(obj).items()
+        }
+
 
 class TitleEditSerializer(serializers.ModelSerializer):
     """Сериализатор для тайтлов на запись"""
@@ -137,13 +367,35 @@ class TitleEditSerializer(serializers.ModelSerializer):
         model = Title
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class TitleBulkSerializer(serializers.ModelSerializer):
+    """Элемент пакетной записи произведений. Слаги категорий и жанров
+    проверяются сразу для всего пакета в api.bulk, а не по одному."""
+    id = serializers.IntegerField(required=False)
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+
+    class Meta:
+        fields = (
+            'id',
+            'name',
+            'year',
+            'description',
+            'category',
+            'genre',
+        )
+        model = Title
+
+
+class ReviewSerializer(
+    SparseFieldsMixin, ValuesRepresentationMixin, serializers.ModelSerializer
+):
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True,
         default=serializers.CurrentUserDefault()
     )
     pub_date = serializers.DateTimeField(read_only=True)
+    field_sources = {'author': ('author__username',)}
 
     class Meta:
         fields = (
@@ -155,34 +407,40 @@ class ReviewSerializer(serializers.ModelSerializer):
         )
         model = Review
 
-    def validate(self, data):
-        """Проверка, что от одного человека на конкретное произведение
-        только один отзыв."""
-        request = self.context.get('request')
-        author = request.user
-        title_id = self.context.get('view').kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        if (
-            request.method != 'PATCH' and (
-            Review.objects.filter(
-                author=author,
-                title=title
-                ).exists()
-            )
-        ):
-            raise serializers.ValidationError(
-                'Только один отзыв на произведение'
-            )
-        return data
+    def create(self, validated_data):
+        """Один отзыв от человека на произведение гарантирует
+        ограничение title_author_together: дубликат не проверяется
+        отдельным запросом, а отсекается самой вставкой. Остальные
+        ошибки целостности (например, произведение удалили параллельно)
+        пробрасываются как есть: отзыв ищется, только когда вставка уже
+        не удалась."""
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            duplicate = Review.objects.filter(
+                title=validated_data['title'],
+                author=validated_data['author'],
+            ).exists()
+            if not duplicate:
+                raise
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Только один отзыв на произведение'
+                ],
+            })
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(
+    SparseFieldsMixin, ValuesRepresentationMixin, serializers.ModelSerializer
+):
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True,
         default=serializers.CurrentUserDefault()
     )
     pub_date = serializers.DateTimeField(read_only=True)
+    field_sources = {'author': ('author__username',)}
 
     class Meta:
         fields = ('id', 'text', 'author', 'pub_date')
@@ -0,0 +1,117 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_migrate, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.signals import deleted_with_parent
+from . import cache
+
+CACHED_MODELS = {
+    Category: 'categories',
+    Genre: 'genres',
+    Title: 'titles',
+}
+
+
+def invalidate_cached_responses(sender, **kwargs):
+    cache.invalidate(CACHED_MODELS[sender])
+
+
+# Подписка только на кешируемые модели: обработчик post_delete без
+# sender отключает быстрое удаление (DELETE без выборки строк) для
+# всех моделей.
+for model in CACHED_MODELS:
+    post_save.connect(invalidate_cached_responses, sender=model)
+    post_delete.connect(invalidate_cached_responses, sender=model)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_title_genres(sender, action, **kwargs):
+    if action.startswith('post_'):
+        cache.invalidate('titles')
+
+
+@receiver(pre_delete, sender=Title)
+def remember_title_reviews(sender, instance, **kwargs):
+    # Отзывы удаляются раньше произведения: их id нужны заранее.
+    instance._review_ids = list(
+        Review.objects.filter(title=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Title)
+def forget_title_reviews(sender, instance, **kwargs):
+    """Версии отзывов и комментариев удалённого произведения удаляются
+    разом; отзывы, удалённые каскадом, свои версии не трогают."""
+    cache.forget(f'reviews:{instance.pk}', *(
+        f'comments:{review_id}'
+        for review_id in getattr(instance, '_review_ids', ())
+    ))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_reviews(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_delete:
+        if deleted_with_parent(instance):
+            return
+        cache.forget(f'comments:{instance.pk}')
+    cache.invalidate('reviews')
+    cache.invalidate(f'reviews:{instance.title_id}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_delete and deleted_with_parent(instance):
+        return
+    cache.invalidate(f'comments:{instance.review_id}')
+
+
+@receiver(pre_delete, sender=User)
+def remember_user_reviews(sender, instance, **kwargs):
+    instance._review_ids = list(
+        Review.objects.filter(author=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_users(sender, instance, created=False, **kwargs):
+    cache.invalidate('users')
+    if kwargs.get('signal') is post_delete:
+        cache.forget(f'user:{instance.pk}')
+    else:
+        cache.invalidate(f'user:{instance.pk}')
+    # Имя автора встроено в отзывы и комментарии; у нового
+    # пользователя их ещё нет.
+    if not created:
+        cache.invalidate('authors')
+    if kwargs.get('signal') is post_delete:
+        # Отзывы и комментарии пользователя удалены каскадом: списки
+        # сбрасывает версия authors, рейтинги произведений — reviews.
+        cache.invalidate('reviews')
+        cache.forget(*(
+            f'comments:{review_id}'
+            for review_id in getattr(instance, '_review_ids', ())
+        ))
+
+
+@receiver(post_migrate)
+def invalidate_after_migrate(sender, **kwargs):
+    """После миграций и flush данные могли измениться в обход сигналов.
+
+    Сигнал приходит для каждого приложения, версии лежат в таблице
+    reviews, поэтому достаточно одного раза — если после миграции
+    таблица версий существует.
+    """
+    if sender.label != 'reviews':
+        return
+    state = kwargs.get('apps')
+    if state is not None:
+        try:
+            state.get_model('reviews', 'ResourceVersion')
+        except LookupError:
+            return
+    cache.invalidate_all()
@@ -1,21 +1,28 @@
 from django.apps import apps
 from django.conf import settings as cfg
-from django.core.mail import send_mail
-from django.db.models import Avg
-from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, pagination, filters, status
+from rest_framework import viewsets, filters, status
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import AccessToken
 
 from reviews import models
-from . import serializers
-from .filters import TitleFilter
-from .mixins import CreateMixin, CategoriesGenresMixin
+from reviews.outbox import enqueue_mail
+from . import bulk, metrics, serializers
+from .export import CSVRenderer, NDJSONRenderer, export_response
+from .filters import TitleFilter, TitleSearchFilter
+from .mixins import (
+    CategoriesGenresMixin, ConditionalListMixin, ConditionalRetrieveMixin,
+    CreateMixin, NestedResourceMixin, RankedTitlesMixin, SparseQuerysetMixin,
+    ValuesListMixin
+)
+from .pagination import (
+    LookupPagination, OptionalCursorPagination, SizedPagination
+)
 from .permissions import (
     AdminOrReadOnly, OwnerOrReadOnly, UserViewSetPermission
 )
@@ -23,9 +30,12 @@ from .permissions import (
 User = apps.get_model(app_label='reviews', model_name='User')
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(
+    SparseQuerysetMixin, ConditionalRetrieveMixin, viewsets.ModelViewSet
+):
+    version_resource = 'users'
     permission_classes = (UserViewSetPermission,)
-    pagination_class = pagination.PageNumberPagination
+    pagination_class = SizedPagination
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
     queryset = User.objects.all()
@@ -69,9 +79,10 @@ class UserCreationViewSet(CreateMixin):
             username=serializer.validated_data.get('username'),
             email=serializer.validated_data.get('email')
         )
+        metrics.registry.inc('yamdb_signups_total')
         token = Token.objects.get_or_create(user_id=user.id)[0]
         key = token.key
-        send_mail(
+        enqueue_mail(
             subject='ACCESS TOKEN',
             message=f'{user.username.capitalize()}, you\''
                     f'r key is\n key - "{key}"',
@@ -89,6 +100,7 @@ class CustomTokenObtainView(APIView):
             _user = User.objects.get(
                 username=serializer.validated_data.get('username'))
         except User.DoesNotExist:
+            metrics.registry.inc('yamdb_auth_failures_total', ('username',))
             return Response(
                 {'username': 'Проверьте правильность username'},
                 status=status.HTTP_404_NOT_FOUND,
@@ -101,15 +113,26 @@ class CustomTokenObtainView(APIView):
                 {'token': str(AccessToken.for_user(_user))},
                 status=status.HTTP_200_OK
             )
+        metrics.registry.inc(
+            'yamdb_auth_failures_total', ('confirmation_code',)
+        )
         return Response(
             {'token': 'Проверьте правильность кода подтверждения'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
 
-class GenreViewSet(CategoriesGenresMixin):
+class GenreViewSet(
+    SparseQuerysetMixin, RankedTitlesMixin, ConditionalListMixin,
+    CategoriesGenresMixin
+):
     """Вьюсет для жанров"""
+    version_resource = 'genres'
+    ranking_model = models.GenreRanking
+    ranking_field = 'genre'
+    cache_responses = True
     permission_classes = (AdminOrReadOnly,)
+    pagination_class = LookupPagination
     queryset = models.Genre.objects.all()
     serializer_class = serializers.GenreSerializer
     filter_backends = (filters.SearchFilter,)
@@ -117,9 +140,17 @@ class GenreViewSet(CategoriesGenresMixin):
     search_fields = ('name',)
 
 
-class CategoryViewSet(CategoriesGenresMixin):
+class CategoryViewSet(
+    SparseQuerysetMixin, RankedTitlesMixin, ConditionalListMixin,
+    CategoriesGenresMixin
+):
     """Вьюсет для категорий"""
+    version_resource = 'categories'
+    ranking_model = models.CategoryRanking
+    ranking_field = 'category'
+    cache_responses = True
     permission_classes = (AdminOrReadOnly,)
+    pagination_class = LookupPagination
     queryset = models.Category.objects.all()
     serializer_class = serializers.CategorySerializer
     filter_backends = (filters.SearchFilter,)
@@ -127,59 +158,115 @@ class CategoryViewSet(CategoriesGenresMixin):
     search_fields = ('name',)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    SparseQuerysetMixin, ConditionalRetrieveMixin, ValuesListMixin,
+    viewsets.ModelViewSet
+):
     """Вьюсет для тайтлов"""
+    version_resource = 'titles'
+    cache_responses = True
     permission_classes = (AdminOrReadOnly,)
-    queryset = (models.Title.objects.all()
-                .annotate(rating=Avg('reviews__score')).order_by('-name'))
-    filter_backends = [DjangoFilterBackend]
+    pagination_class = SizedPagination
+    queryset = (models.Title.objects
+                .select_related('category')
+                .prefetch_related('genre')
+                .order_by('-name'))
+    filter_backends = [DjangoFilterBackend, TitleSearchFilter]
     filterset_class = TitleFilter
+    export_chunk_size = 2000
+    stats_fields = (
+        'review_count', 'rating', 'weighted_rating',
+        *models.SCORE_COUNT_FIELDS.values(),
+    )
+
+    def get_queryset(self):
+        if self.action == 'stats':
+            return models.Title.objects.only(*self.stats_fields)
+        return super().get_queryset()
 
     def get_serializer_class(self):
+        if self.action == 'stats':
+            return serializers.TitleStatsSerializer
         if self.request.method == 'GET':
             return serializers.TitleReadOnlySerializer
         return serializers.TitleEditSerializer
 
+    @action(detail=True, url_path='stats')
+    def stats(self, request, *args, **kwargs):
+        """Число отзывов, средняя, медиана и гистограмма оценок из
+        счётчиков произведения, без чтения отзывов."""
+        return self.retrieve(request, *args, **kwargs)
 
-class ReviewViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=('post', 'patch'), url_path='bulk')
+    def bulk(self, request):
+        """Пакетное создание (POST) или изменение по id (PATCH)."""
+        write = (
+            bulk.create_titles if request.method == 'POST'
+            else bulk.update_titles
+        )
+        try:
+            results, status_code = write(request.data)
+        except bulk.BulkError as error:
+            return Response(
+                {api_settings.NON_FIELD_ERRORS_KEY: [error.detail]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(results, status=status_code)
+
+    @action(
+        detail=False,
+        url_path='export',
+        renderer_classes=(NDJSONRenderer, CSVRenderer),
+    )
+    def export(self, request):
+        """Весь каталог с учётом фильтров одним потоковым ответом."""
+        return export_response(
+            self.filter_queryset(self.get_queryset()),
+            request.accepted_renderer.format,
+            self.export_chunk_size,
+        )
+
+
+class ReviewViewSet(
+    NestedResourceMixin, SparseQuerysetMixin, ConditionalRetrieveMixin,
+    ValuesListMixin, viewsets.ModelViewSet
+):
     """Вьюсет для ревью"""
     permission_classes = (OwnerOrReadOnly,)
     serializer_class = serializers.ReviewSerializer
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
     lookup_field = 'id'
+    parent_model = models.Title
+    parent_url_kwargs = {'id': 'title_id'}
+    parent_field = 'title'
+
+    def get_version_resources(self):
+        return (f'reviews:{self.kwargs.get("title_id")}', 'authors')
 
     def get_queryset(self):
-        title = get_object_or_404(models.Title, id=self.kwargs.get('title_id'))
-        queryset = title.reviews.all().order_by('-pub_date')
+        queryset = (self.get_parent().reviews.select_related('author')
+                    .order_by('-pub_date'))
         return queryset
 
-    def perform_create(self, serializer):
-        author = self.request.user
-        title = get_object_or_404(models.Title, id=self.kwargs.get('title_id'))
-        serializer.save(
-            author=author,
-            title=title
-        )
-
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    NestedResourceMixin, SparseQuerysetMixin, ConditionalRetrieveMixin,
+    ValuesListMixin, viewsets.ModelViewSet
+):
     permission_classes = (OwnerOrReadOnly,)
     serializer_class = serializers.CommentSerializer
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('pub_date', 'id')
+    parent_model = models.Review
+    parent_url_kwargs = {'id': 'review_id', 'title_id': 'title_id'}
+    parent_related = ('title',)
+    parent_field = 'review'
+
+    def get_version_resources(self):
+        return (f'comments:{self.kwargs.get("review_id")}', 'authors')
 
     def get_queryset(self):
-        review = get_object_or_404(
-            models.Review,
-            id=self.kwargs.get('review_id'),
-        )
-        queryset = models.Comment.objects.filter(review=review)
+        queryset = (self.get_parent().comments.select_related('author')
+                    .order_by('id'))
         return queryset
-
-    def perform_create(self, serializer):
-        author = self.request.user
-        review = get_object_or_404(
-            models.Review,
-            id=self.kwargs.get('review_id'),
-        )
-        serializer.save(
-            author=author,
-            review=review
-        )
@@ -0,0 +1,76 @@
+"""SQLite для рабочих узлов.
+
+Стандартный бэкенд Django с дополнительными ключами OPTIONS:
+
+- `pragmas` — PRAGMA, выполняемые при каждом подключении (WAL,
+  synchronous, cache_size, mmap_size и т.д.);
+- `transaction_mode` — режим BEGIN для atomic(). С IMMEDIATE блокировка
+  записи берётся в начале транзакции, и ожидание `timeout` работает;
+  с DEFERRED SQLite сразу отвечает «database is locked», если читающая
+  транзакция пытается стать пишущей, пока пишет другое соединение;
+- `busy_retries` — сколько раз повторить запрос вне транзакции (и сам
+  BEGIN), если база осталась заблокированной после ожидания `timeout`.
+  Внутри транзакции повтор небезопасен, ошибка передаётся дальше.
+"""
+import time
+
+from django.db.backends.sqlite3 import base
+
+RETRY_DELAY = 0.05
+
+
+def _is_locked(error):
+    return 'is locked' in str(error)
+
+
+class RetryingCursorWrapper(base.SQLiteCursorWrapper):
+    retries = 0
+
+    def execute(self, query, params=None):
+        attempt = 0
+        while True:
+            try:
+                return super().execute(query, params)
+            except base.Database.OperationalError as error:
+                if (
+                    attempt >= self.retries
+                    or self.connection.in_transaction
+                    or not _is_locked(error)
+                ):
+                    raise
+                attempt += 1
+                time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = options.get('pragmas', {})
+        self.transaction_mode = options.get('transaction_mode')
+        self.cursor_class = type(
+            'RetryingCursorWrapper',
+            (RetryingCursorWrapper,),
+            {'retries': options.get('busy_retries', 0)},
+        )
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for option in ('pragmas', 'transaction_mode', 'busy_retries'):
+            params.pop(option, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        return self.connection.cursor(factory=self.cursor_class)
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
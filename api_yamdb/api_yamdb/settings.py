@@ -26,6 +26,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.instrumentation.TimingMiddleware',
+    'api.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -35,6 +38,22 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Замеры SQL, сериализации и рендеринга в заголовке Server-Timing.
+API_TIMING_ENABLED = os.getenv('API_TIMING_ENABLED', '') == '1'
+API_TIMING_SINKS = (
+    'api.instrumentation.LogSink',
+    'api.instrumentation.RingBufferSink',
+)
+API_TIMING_BUFFER_SIZE = 1000
+
+# Метрики Prometheus на /metrics. При нескольких воркерах каждый пишет
+# свой файл в METRICS_DIR, а /metrics суммирует их. Каталог должен быть
+# локальным для узла: файлы процессов, которых нет среди живых, /metrics
+# переносит в общий архив.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1
+
 ROOT_URLCONF = 'api_yamdb.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -58,11 +77,71 @@ WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'api_yamdb.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
 
+# Профиль SQLite для рабочих узлов: DATABASE_PROFILE=sqlite-production.
+# WAL не блокирует читателей на время записи, synchronous=NORMAL в WAL
+# не портит базу при сбое, транзакции сразу берут блокировку записи и
+# ждут её до `timeout` секунд, а соединения переиспользуются.
+SQLITE_PRODUCTION_PROFILE = {
+    'CONN_MAX_AGE': 600,
+    'OPTIONS': {
+        'timeout': 5,
+        'transaction_mode': 'IMMEDIATE',
+        'busy_retries': 3,
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -64 * 1024,
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+if os.getenv('DATABASE_PROFILE') == 'sqlite-production':
+    DATABASES['default'].update(SQLITE_PRODUCTION_PROFILE)
+
+# Реплики только для чтения, например
+# DATABASE_REPLICAS=/data/replica1.sqlite3,/data/replica2.sqlite3.
+# Безопасные запросы к API читают с них, записи идут в default; после
+# записи чтение пользователя DATABASE_PIN_SECONDS секунд остаётся на
+# default. Отметка об этом хранится в кеше DATABASE_PIN_CACHE, который
+# при нескольких воркерах должен быть общим (memcached, redis).
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica_{number}'] = {
+        'ENGINE': 'api_yamdb.backends.sqlite3',
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# round_robin или least_latency
+DATABASE_REPLICA_SELECTION = os.getenv(
+    'DATABASE_REPLICA_SELECTION', 'round_robin'
+)
+DATABASE_PIN_SECONDS = 5
+DATABASE_PIN_CACHE = os.getenv('DATABASE_PIN_CACHE', 'default')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Кеш ответов каталога сбрасывается сигналами моделей: ключ — ETag по
+# версиям ресурсов из базы, одинаковым во всех процессах, поэтому
+# подходит и locmem (у каждого воркера своя копия). Таймаут только
+# освобождает место от ответов устаревших версий.
+API_CACHE_RESPONSES = os.getenv('API_CACHE_RESPONSES', '1') == '1'
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = 60 * 60
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -102,16 +181,35 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
-    'DEFAULT_PAGINATION_CLASS':
-        'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.SizedPagination',
     'PAGE_SIZE': 10,
 }
 
+# Списки произведений, отзывов и комментариев строятся по строкам
+# .values() без объектов моделей; False — обычные сериализаторы DRF.
+API_VALUES_SERIALIZATION = True
+
+# Наибольший размер пакета для /api/v1/titles/bulk/.
+TITLE_BULK_MAX_ITEMS = 1000
+
+# Байесовский рейтинг: оценки произведения дополняются
+# RATING_PRIOR_WEIGHT оценками RATING_PRIOR_MEAN. После изменения
+# значений пересчитайте рейтинги командой rebuild_ratings.
+RATING_PRIOR_MEAN = 5.5
+RATING_PRIOR_WEIGHT = 10
+
+# Пользователи из JWT кешируются в процессе до изменения их данных:
+# версия пользователя сверяется с базой на каждом запросе, поэтому
+# изменение роли или блокировка видны всем воркерам сразу. TTL только
+# ограничивает срок хранения записи.
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TTL = 60
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -120,3 +218,15 @@ SIMPLE_JWT = {
 
 DEFAULT_FROM_EMAIL = 'noreply@api_yamdb.ru'
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+# Письма при регистрации ставятся в очередь и отправляются командой
+# send_queued_mail; reviews.outbox.ImmediateMailQueue отправляет сразу.
+MAIL_QUEUE = os.getenv('MAIL_QUEUE', 'reviews.outbox.DatabaseMailQueue')
+MAIL_MAX_ATTEMPTS = 5
+MAIL_RETRY_DELAY = 60
+MAIL_RETRY_MAX_DELAY = 60 * 60
+# На сколько секунд воркер забирает пачку писем; после падения воркера
+# письма снова уходят в отправку по истечении аренды.
+MAIL_LEASE_SECONDS = 5 * 60
+# Таймаут SMTP, секунд: зависшее соединение не должно пережить аренду.
+EMAIL_TIMEOUT = 30
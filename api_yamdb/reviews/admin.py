@@ -45,3 +45,11 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ('pk', 'review', 'text', 'author', 'pub_date',)
     search_fields = ('review', 'text',)
     empty_value_display = '-пусто-'
+
+
+@admin.register(models.OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'subject', 'to', 'attempts', 'next_attempt',
+                    'failed')
+    list_filter = ('failed',)
+    empty_value_display = '-пусто-'
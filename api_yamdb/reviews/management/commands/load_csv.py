@@ -0,0 +1,181 @@
+import csv
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from api import cache
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.rankings import rebuild_rankings
+from reviews.ratings import rebuild_ratings
+
+
+def _int_or_none(value):
+    return int(value) if value else None
+
+
+def _user(row):
+    return User(
+        id=int(row['id']),
+        username=row['username'],
+        email=row['email'],
+        role=row['role'] or User.USER,
+        bio=row['bio'],
+        first_name=row['first_name'],
+        last_name=row['last_name'],
+        password=make_password(None),
+    )
+
+
+def _slug_model(model):
+    def build(row):
+        return model(id=int(row['id']), name=row['name'], slug=row['slug'])
+    return build
+
+
+def _title(row):
+    return Title(
+        id=int(row['id']),
+        name=row['name'],
+        year=_int_or_none(row['year']),
+        category_id=_int_or_none(row['category']),
+    )
+
+
+def _genre_title(row):
+    return Title.genre.through(
+        id=int(row['id']),
+        title_id=int(row['title_id']),
+        genre_id=int(row['genre_id']),
+    )
+
+
+def _review(row):
+    return Review(
+        id=int(row['id']),
+        title_id=int(row['title_id']),
+        text=row['text'],
+        author_id=int(row['author']),
+        score=int(row['score']),
+        pub_date=parse_datetime(row['pub_date']),
+    )
+
+
+def _comment(row):
+    return Comment(
+        id=int(row['id']),
+        review_id=int(row['review_id']),
+        text=row['text'],
+        author_id=int(row['author']),
+        pub_date=parse_datetime(row['pub_date']),
+    )
+
+
+# Порядок важен: каждая таблица загружается после тех,
+# на которые ссылаются её внешние ключи.
+SOURCES = (
+    ('users.csv', User, _user),
+    ('category.csv', Category, _slug_model(Category)),
+    ('genre.csv', Genre, _slug_model(Genre)),
+    ('titles.csv', Title, _title),
+    ('genre_title.csv', Title.genre.through, _genre_title),
+    ('review.csv', Review, _review),
+    ('comments.csv', Comment, _comment),
+)
+
+
+@contextmanager
+def _keep_pub_date(model):
+    """Отключает auto_now_add, чтобы bulk_create сохранил даты из файла."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Загружает данные из CSV-файлов static/data в базу'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'static', 'data'),
+            help='Каталог с CSV-файлами',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одном INSERT',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        for filename, model, build in SOURCES:
+            filepath = os.path.join(path, filename)
+            if not os.path.exists(filepath):
+                self.stdout.write(f'{filename}: файл не найден, пропущен')
+                continue
+            self.load(filepath, model, build, batch_size)
+        self.reset_sequences()
+        rebuild_ratings(Title, Review)
+        rebuild_rankings()
+        # Данные изменены в обход сигналов: ETag и кеш ответов должны
+        # смениться.
+        cache.invalidate_all()
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
+
+    def load(self, filepath, model, build, batch_size):
+        filename = os.path.basename(filepath)
+        started = time.monotonic()
+        loaded = 0
+        batch = []
+        with open(filepath, encoding='utf-8', newline='') as source, \
+                transaction.atomic(), _keep_pub_date(model):
+            for row in csv.DictReader(source):
+                batch.append(build(row))
+                if len(batch) >= batch_size:
+                    loaded += self.flush(model, batch)
+                    self.report(filename, loaded, started)
+            if batch:
+                loaded += self.flush(model, batch)
+        self.report(filename, loaded, started, ending='\n')
+
+    @staticmethod
+    def flush(model, batch):
+        model.objects.bulk_create(batch)
+        count = len(batch)
+        batch.clear()
+        return count
+
+    def report(self, filename, loaded, started, ending='\r'):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f'{filename}: {loaded} строк, {loaded / elapsed:.0f} строк/с',
+            ending=ending,
+        )
+
+    def reset_sequences(self):
+        """Сдвигает счётчики первичных ключей после вставки явных id."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [model for _, model, _ in SOURCES]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
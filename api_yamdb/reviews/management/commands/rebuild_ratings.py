@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api import cache
+from reviews.models import Review, Title
+from reviews.rankings import rebuild_rankings
+from reviews.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает rating, review_count и score_sum всех произведений '
+        'и таблицы рейтингов по жанрам и категориям'
+    )
+
+    def handle(self, *args, **options):
+        rebuild_ratings(Title, Review)
+        rebuild_rankings()
+        # Данные изменены в обход сигналов: ETag и кеш ответов должны
+        # смениться.
+        cache.invalidate_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинги пересчитаны: {Title.objects.count()} произведений'
+        ))
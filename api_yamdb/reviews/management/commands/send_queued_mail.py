@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.outbox import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди OutgoingEmail'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Сколько писем отправлять через одно соединение',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Не завершаться, а опрашивать очередь',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Пауза между опросами пустой очереди, секунд',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, errors = send_queued_mail(options['batch_size'])
+            if sent or errors:
+                self.stdout.write(f'Отправлено: {sent}, ошибок: {errors}')
+            if not options['loop']:
+                break
+            if not sent and not errors:
+                time.sleep(options['interval'])
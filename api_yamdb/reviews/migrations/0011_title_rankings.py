@@ -0,0 +1,75 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from reviews.rankings import rebuild_rankings
+
+
+def fill_rankings(apps, schema_editor):
+    rebuild_rankings(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenreRanking',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.FloatField(default=0, verbose_name='Рейтинг')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('year', models.IntegerField(blank=True, null=True, verbose_name='Год выпуска')),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.Genre')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.Title')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CategoryRanking',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.FloatField(default=0, verbose_name='Рейтинг')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('year', models.IntegerField(blank=True, null=True, verbose_name='Год выпуска')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.Category')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.Title')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='genreranking',
+            index=models.Index(fields=['genre', 'rating', 'title'], name='genre_rank_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genreranking',
+            index=models.Index(fields=['genre', 'year', 'title'], name='genre_rank_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genreranking',
+            index=models.Index(fields=['genre', 'review_count', 'title'], name='genre_rank_reviews_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='genreranking',
+            constraint=models.UniqueConstraint(fields=('genre', 'title'), name='genre_ranking_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='categoryranking',
+            index=models.Index(fields=['category', 'rating', 'title'], name='category_rank_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='categoryranking',
+            index=models.Index(fields=['category', 'year', 'title'], name='category_rank_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='categoryranking',
+            index=models.Index(fields=['category', 'review_count', 'title'], name='category_rank_reviews_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='categoryranking',
+            constraint=models.UniqueConstraint(fields=('category', 'title'), name='category_ranking_unique'),
+        ),
+        migrations.RunPython(fill_rankings, migrations.RunPython.noop),
+    ]
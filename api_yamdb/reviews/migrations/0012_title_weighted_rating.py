@@ -0,0 +1,114 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:07
+
+from django.db import migrations, models
+
+from reviews import search
+from reviews.rankings import rebuild_rankings
+from reviews.ratings import rebuild_ratings
+
+
+def install_search(apps, schema_editor):
+    search.install(schema_editor.connection)
+
+
+def uninstall_search(apps, schema_editor):
+    search.uninstall(schema_editor.connection)
+
+
+def fill_weighted_ratings(apps, schema_editor):
+    rebuild_ratings(
+        apps.get_model('reviews', 'Title'),
+        apps.get_model('reviews', 'Review'),
+    )
+    rebuild_rankings(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_title_rankings'),
+    ]
+
+    # SQLite добавляет столбцы пересозданием reviews_title, при котором
+    # пропадают триггеры поискового индекса: индекс снимается до
+    # изменения таблицы и ставится заново после.
+    operations = [
+        migrations.RunPython(uninstall_search, install_search),
+        migrations.AddField(
+            model_name='categoryranking',
+            name='weighted_rating',
+            field=models.FloatField(default=0, verbose_name='Взвешенный рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='genreranking',
+            name='weighted_rating',
+            field=models.FloatField(default=0, verbose_name='Взвешенный рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_10_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов с оценкой 10'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_1_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов с оценкой 1'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_2_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов с оценкой 2'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_3_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов с оценкой 3'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_4_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов с оценкой 4'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_5_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов с оценкой 5'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_6_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов с оценкой 6'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_7_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов с оценкой 7'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_8_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов с оценкой 8'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_9_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов с оценкой 9'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='weighted_rating',
+            field=models.FloatField(blank=True, null=True, verbose_name='Взвешенный рейтинг'),
+        ),
+        migrations.AddIndex(
+            model_name='categoryranking',
+            index=models.Index(fields=['category', 'weighted_rating', 'title'], name='category_rank_weighted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genreranking',
+            index=models.Index(fields=['genre', 'weighted_rating', 'title'], name='genre_rank_weighted_idx'),
+        ),
+        migrations.RunPython(install_search, uninstall_search),
+        migrations.RunPython(
+            fill_weighted_ratings, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_title_weighted_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('resource', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Ресурс')),
+                ('version', models.BigIntegerField(verbose_name='Версия')),
+            ],
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from .validators import year_validator
 
@@ -135,11 +136,50 @@ class Title(models.Model):
         null=True,
         related_name='titles'
     )
+    rating = models.FloatField(
+        'Рейтинг',
+        blank=True,
+        null=True,
+    )
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+    )
+    score_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+    )
+    # Байесовское среднее: оценки произведения вместе с
+    # RATING_PRIOR_WEIGHT воображаемыми оценками RATING_PRIOR_MEAN.
+    weighted_rating = models.FloatField(
+        'Взвешенный рейтинг',
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('name',), name='title_name_idx'),
+            models.Index(fields=('year', 'name'), name='title_year_name_idx'),
+            models.Index(
+                fields=('category', 'name'), name='title_category_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+# Гистограмма оценок произведения: число отзывов с каждой оценкой.
+SCORES = range(1, 11)
+SCORE_COUNT_FIELDS = {score: f'score_{score}_count' for score in SCORES}
+for score, field_name in SCORE_COUNT_FIELDS.items():
+    Title.add_to_class(field_name, models.PositiveIntegerField(
+        f'Отзывов с оценкой {score}',
+        default=0,
+    ))
+
+
 class Review(models.Model):
     """Класс, описывающий отзывы."""
     title = models.ForeignKey(
@@ -156,8 +196,12 @@ class Review(models.Model):
     score = models.IntegerField(
         'Оценка',
         validators=(
-            MinValueValidator(1, message='Оценка не может быть менее 1'),
-            MaxValueValidator(10, message='Оценка не может быть более 10')
+            MinValueValidator(
+                SCORES[0], message='Оценка не может быть менее 1'
+            ),
+            MaxValueValidator(
+                SCORES[-1], message='Оценка не может быть более 10'
+            )
         )
     )
     pub_date = models.DateTimeField('Дата и время публикации',
@@ -170,10 +214,43 @@ class Review(models.Model):
                 name='title_author_together'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('title', '-pub_date', '-id'),
+                name='review_title_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'Отзыв на {self.title} от {self.author}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating_values()
+        return instance
+
+    def remember_rating_values(self):
+        """Запоминает сохранённые в базе title_id и score, чтобы при
+        изменении отзыва пересчитать рейтинг без повторного запроса."""
+        loaded = self.__dict__
+        if 'title_id' in loaded and 'score' in loaded:
+            self._rating_values = (self.title_id, self.score)
+
+    def loaded_rating_values(self):
+        return getattr(self, '_rating_values', (None, None))
+
+    def load_rating_values(self):
+        """Дочитывает сохранённые title_id и score, если отзыв загружен
+        без них (only(), defer())."""
+        if not hasattr(self, '_rating_values'):
+            values = (
+                type(self)._base_manager.filter(pk=self.pk)
+                .values_list('title_id', 'score').first()
+            )
+            if values is not None:
+                self._rating_values = values
+
 
 class Comment(models.Model):
     """Класс, описывающий комментарии."""
@@ -195,3 +272,145 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=('review', 'id'), name='comment_review_id_idx'
+            ),
+            models.Index(
+                fields=('review', 'pub_date', 'id'),
+                name='comment_review_pub_date_idx'
+            ),
+        ]
+
+
+class Ranking(models.Model):
+    """Место произведения в рейтинге группы (жанра или категории).
+
+    Поля сортировки скопированы из произведения, чтобы лучшие
+    произведения группы выбирались чтением одного индекса, без
+    соединения с каталогом и сортировки. Строки поддерживает
+    reviews.rankings.
+    """
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    # 0 для произведений без отзывов: NULL сортируется в разных базах
+    # по-разному.
+    rating = models.FloatField('Рейтинг', default=0)
+    weighted_rating = models.FloatField('Взвешенный рейтинг', default=0)
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+    )
+    year = models.IntegerField('Год выпуска', blank=True, null=True)
+
+    class Meta:
+        abstract = True
+
+
+class GenreRanking(Ranking):
+    genre = models.ForeignKey(
+        Genre,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('genre', 'title'), name='genre_ranking_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('genre', 'rating', 'title'),
+                name='genre_rank_rating_idx'
+            ),
+            models.Index(
+                fields=('genre', 'weighted_rating', 'title'),
+                name='genre_rank_weighted_idx'
+            ),
+            models.Index(
+                fields=('genre', 'year', 'title'),
+                name='genre_rank_year_idx'
+            ),
+            models.Index(
+                fields=('genre', 'review_count', 'title'),
+                name='genre_rank_reviews_idx'
+            ),
+        ]
+
+
+class CategoryRanking(Ranking):
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('category', 'title'), name='category_ranking_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('category', 'rating', 'title'),
+                name='category_rank_rating_idx'
+            ),
+            models.Index(
+                fields=('category', 'weighted_rating', 'title'),
+                name='category_rank_weighted_idx'
+            ),
+            models.Index(
+                fields=('category', 'year', 'title'),
+                name='category_rank_year_idx'
+            ),
+            models.Index(
+                fields=('category', 'review_count', 'title'),
+                name='category_rank_reviews_idx'
+            ),
+        ]
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку."""
+    subject = models.TextField('Тема')
+    body = models.TextField('Текст')
+    from_email = models.TextField('Отправитель')
+    to = models.TextField('Получатели, по одному на строку')
+    created = models.DateTimeField('Дата постановки в очередь',
+                                   auto_now_add=True)
+    next_attempt = models.DateTimeField(
+        'Время следующей попытки',
+        default=timezone.now,
+    )
+    attempts = models.PositiveIntegerField('Количество попыток', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    failed = models.BooleanField('Попытки исчерпаны', default=False)
+
+    class Meta:
+        ordering = ('next_attempt', 'id')
+        indexes = [
+            models.Index(
+                fields=('failed', 'next_attempt'),
+                name='outgoing_email_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.to}'
+
+
+class ResourceVersion(models.Model):
+    """Версия ресурса API (`titles`, `reviews:<title_id>`...) — время
+    его последнего изменения в микросекундах. Версии сдвигают сигналы
+    моделей, по ним строятся ETag и Last-Modified (api/cache.py)."""
+    resource = models.CharField('Ресурс', max_length=64, primary_key=True)
+    version = models.BigIntegerField('Версия')
+
+    def __str__(self):
+        return f'{self.resource}: {self.version}'
@@ -0,0 +1,155 @@
+"""Очередь исходящих писем.
+
+Реализация выбирается настройкой MAIL_QUEUE. DatabaseMailQueue только
+сохраняет письмо в таблицу OutgoingEmail, а отправляет его команда
+`send_queued_mail` пачками через одно SMTP-соединение вне транзакций,
+с повторными попытками и экспоненциальной задержкой.
+ImmediateMailQueue отправляет письмо сразу, как send_mail.
+"""
+from contextlib import suppress
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutgoingEmail
+
+
+class BaseMailQueue:
+    def enqueue(self, subject, message, from_email, recipient_list):
+        raise NotImplementedError
+
+
+class ImmediateMailQueue(BaseMailQueue):
+    def enqueue(self, subject, message, from_email, recipient_list):
+        send_mail(
+            subject=subject,
+            message=message,
+            from_email=from_email,
+            recipient_list=recipient_list,
+        )
+
+
+class DatabaseMailQueue(BaseMailQueue):
+    def enqueue(self, subject, message, from_email, recipient_list):
+        OutgoingEmail.objects.create(
+            subject=subject,
+            body=message,
+            from_email=from_email,
+            to='\n'.join(recipient_list),
+        )
+
+
+def get_mail_queue():
+    return import_string(settings.MAIL_QUEUE)()
+
+
+def enqueue_mail(subject, message, from_email, recipient_list):
+    get_mail_queue().enqueue(subject, message, from_email, recipient_list)
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'MAIL_RETRY_DELAY', 60)
+    limit = getattr(settings, 'MAIL_RETRY_MAX_DELAY', 60 * 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), limit))
+
+
+def claim_batch(batch_size):
+    """Забирает пачку писем, время которых подошло, одним UPDATE.
+
+    Вместо блокировки строк на время отправки письма берутся в аренду:
+    next_attempt сдвигается на MAIL_LEASE_SECONDS вперёд, и другие
+    воркеры их не видят. Если воркер упадёт, письма снова станут
+    доступны, когда аренда истечёт.
+    """
+    now = timezone.now()
+    lease = now + timedelta(
+        seconds=getattr(settings, 'MAIL_LEASE_SECONDS', 5 * 60)
+    )
+    due = OutgoingEmail.objects.filter(failed=False, next_attempt__lte=now)
+    with transaction.atomic():
+        # Условие повторено во внешнем UPDATE: строку, которую уже
+        # забрал другой воркер, СУБД перепроверит и пропустит.
+        claimed = due.filter(
+            pk__in=due.order_by('next_attempt', 'id').values('pk')[:batch_size]
+        ).update(next_attempt=lease)
+        if not claimed:
+            return []
+        return list(OutgoingEmail.objects.filter(next_attempt=lease))
+
+
+def deliver(batch):
+    """Отправляет письма через одно соединение вне транзакции.
+
+    Возвращает id отправленных писем и пары (письмо, ошибка) для
+    остальных. Если соединение не открылось, ошибка у всей пачки.
+    """
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        return [], [(email, error) for email in batch]
+    delivered, failures = [], []
+    try:
+        for email in batch:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=email.to.splitlines(),
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                failures.append((email, error))
+            else:
+                delivered.append(email.pk)
+    finally:
+        # Ошибка при закрытии не должна потерять результаты отправки.
+        with suppress(Exception):
+            connection.close()
+    return delivered, failures
+
+
+def record_results(delivered, failures):
+    """Короткой транзакцией удаляет отправленные письма и откладывает
+    неотправленные с экспоненциальной задержкой.
+
+    Ошибка записывается, только пока письмо в нашей аренде (next_attempt
+    не изменился с claim_batch): если аренда истекла, письмо уже
+    забрал или удалил другой воркер, и его результат важнее.
+    """
+    max_attempts = getattr(settings, 'MAIL_MAX_ATTEMPTS', 5)
+    with transaction.atomic():
+        # Письма содержат коды подтверждения: после отправки не храним.
+        OutgoingEmail.objects.filter(pk__in=delivered).delete()
+        for email, error in failures:
+            attempts = email.attempts + 1
+            OutgoingEmail.objects.filter(
+                pk=email.pk, next_attempt=email.next_attempt
+            ).update(
+                attempts=attempts,
+                last_error=repr(error),
+                failed=attempts >= max_attempts,
+                next_attempt=timezone.now() + retry_delay(attempts),
+            )
+
+
+def send_queued_mail(batch_size=100):
+    """Отправляет пачку писем, время которых подошло.
+
+    Возвращает пару (отправлено, ошибок). Базу держат только две
+    короткие транзакции — аренда пачки и запись результатов, поэтому
+    медленный SMTP-сервер не блокирует запись в базу (в SQLite — всю
+    базу) для регистраций.
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+    delivered, failures = deliver(batch)
+    record_results(delivered, failures)
+    return len(delivered), len(failures)
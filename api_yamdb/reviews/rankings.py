@@ -0,0 +1,150 @@
+"""Таблицы рейтингов произведений по жанрам и категориям.
+
+В GenreRanking и CategoryRanking по строке на пару (группа,
+произведение) с копией полей сортировки. Строки произведения
+пересоздаются при изменении самого произведения или его жанров
+(sync_titles), а при изменении отзывов обновляются только рейтинг и
+число отзывов (refresh_scores). Пакетно созданные произведения
+добавляются без повторного чтения из базы (add_titles).
+rebuild_rankings заполняет таблицы заново из каталога.
+"""
+from django.apps import apps as global_apps
+from django.db import connection, transaction
+from django.db.models import FloatField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import CategoryRanking, GenreRanking, Title
+
+# Размер порции id в IN: старые сборки SQLite ограничивают число
+# параметров запроса 999.
+CHUNK_SIZE = 500
+TITLE_COLUMNS = (
+    'id', 'category_id', 'rating', 'weighted_rating', 'review_count', 'year'
+)
+
+# Столбец таблицы рейтингов -> выражение по строке произведения для
+# rebuild_rankings.
+RANKING_COLUMNS = {
+    'title_id': 'title.id',
+    'rating': 'COALESCE(title.rating, 0)',
+    'weighted_rating': 'COALESCE(title.weighted_rating, 0)',
+    'review_count': 'title.review_count',
+    'year': 'title.year',
+}
+
+
+def chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def refresh_scores(title_ids):
+    """Переносит рейтинги и число отзывов произведений в их строки
+    рейтингов: по одному UPDATE на таблицу."""
+    title = Title.objects.filter(pk=OuterRef('title_id'))
+    values = {
+        field: Coalesce(
+            Subquery(title.values(field)), 0, output_field=FloatField()
+        )
+        for field in ('rating', 'weighted_rating')
+    }
+    values['review_count'] = Subquery(title.values('review_count'))
+    GenreRanking.objects.filter(title_id__in=title_ids).update(**values)
+    CategoryRanking.objects.filter(title_id__in=title_ids).update(**values)
+
+
+def _build_rows(titles, links):
+    """Строки рейтингов по кортежам TITLE_COLUMNS произведений и
+    парам (title_id, genre_id)."""
+    sort_fields = {}
+    categories = []
+    for (title_id, category_id, rating, weighted_rating, review_count,
+         year) in titles:
+        sort_fields[title_id] = {
+            'title_id': title_id,
+            'rating': rating or 0,
+            'weighted_rating': weighted_rating or 0,
+            'review_count': review_count,
+            'year': year,
+        }
+        if category_id is not None:
+            categories.append(CategoryRanking(
+                category_id=category_id, **sort_fields[title_id]
+            ))
+    genres = [
+        GenreRanking(genre_id=genre_id, **sort_fields[title_id])
+        for title_id, genre_id in links
+    ]
+    return genres, categories
+
+
+def _insert(genres, categories):
+    GenreRanking.objects.bulk_create(genres)
+    CategoryRanking.objects.bulk_create(categories)
+
+
+def add_titles(titles, links):
+    """Добавляет строки только что созданных произведений без чтения
+    их из базы: пакетное создание уже держит их в памяти."""
+    _insert(*_build_rows(
+        (
+            tuple(getattr(title, column) for column in TITLE_COLUMNS)
+            for title in titles
+        ),
+        links,
+    ))
+
+
+@transaction.atomic
+def sync_titles(title_ids):
+    """Пересоздаёт строки рейтингов произведений: после создания или
+    изменения произведения, его категории или жанров."""
+    for ids in chunks(set(title_ids)):
+        GenreRanking.objects.filter(title_id__in=ids).delete()
+        CategoryRanking.objects.filter(title_id__in=ids).delete()
+        _insert(*_build_rows(
+            Title.objects.filter(pk__in=ids).values_list(*TITLE_COLUMNS),
+            Title.genre.through.objects.filter(title_id__in=ids)
+            .values_list('title_id', 'genre_id'),
+        ))
+
+
+def rebuild_rankings(apps=global_apps):
+    """Заполняет таблицы рейтингов заново двумя INSERT ... SELECT.
+
+    Миграции передают исторические модели: столбцы, которых у таблицы
+    ещё нет, не заполняются.
+    """
+    title_model = apps.get_model('reviews', 'Title')
+    through = title_model.genre.through
+    quote = connection.ops.quote_name
+    title_table = quote(title_model._meta.db_table)
+    sources = (
+        (
+            apps.get_model('reviews', 'GenreRanking'), 'genre_id',
+            f'{quote(through._meta.db_table)} AS link '
+            f'JOIN {title_table} AS title ON title.id = link.title_id',
+            'link.genre_id',
+        ),
+        (
+            apps.get_model('reviews', 'CategoryRanking'), 'category_id',
+            f'{title_table} AS title',
+            'title.category_id',
+        ),
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model, group_column, source, group in sources:
+            table = quote(model._meta.db_table)
+            fields = {field.column for field in model._meta.fields}
+            columns = {
+                column: value for column, value in RANKING_COLUMNS.items()
+                if column in fields
+            }
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(
+                f'INSERT INTO {table} ({quote(group_column)}, '
+                f'{", ".join(map(quote, columns))}) '
+                f'SELECT {group}, {", ".join(columns.values())} '
+                f'FROM {source} WHERE {group} IS NOT NULL'
+            )
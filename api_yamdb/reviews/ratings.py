@@ -0,0 +1,165 @@
+"""Счётчики оценок произведений.
+
+У произведения хранятся число отзывов, сумма оценок, гистограмма
+оценок (score_N_count), средняя оценка `rating` и байесовское среднее
+`weighted_rating` — средняя оценка, в которую добавлены
+RATING_PRIOR_WEIGHT воображаемых оценок RATING_PRIOR_MEAN. Поэтому
+произведение с одной оценкой 10 не обгоняет произведения с тысячами
+отзывов. Сигналы отзывов сдвигают счётчики одним UPDATE
+(apply_score_delta), rebuild_ratings пересчитывает их заново.
+
+Миграции вызывают rebuild_ratings с историческими моделями, поэтому
+поля, которых у модели ещё нет, пропускаются.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import SCORE_COUNT_FIELDS
+
+
+def get_prior():
+    """(оценка, вес) априорного распределения байесовского среднего."""
+    return (
+        getattr(settings, 'RATING_PRIOR_MEAN', 5.5),
+        getattr(settings, 'RATING_PRIOR_WEIGHT', 10),
+    )
+
+
+def _average_expression(count_delta=0, sum_delta=0, prior=(0, 0)):
+    """Средняя оценка по счётчикам, сдвинутым на дельты, с `prior`
+    воображаемыми оценками; None без отзывов.
+
+    В UPDATE все выражения видят значения строки до изменения, поэтому
+    среднее считается из старых счётчиков плюс дельты.
+    """
+    mean, weight = prior
+    return Case(
+        When(review_count=-count_delta, then=Value(None)),
+        default=(
+            Cast(F('score_sum') + (sum_delta + mean * weight), FloatField())
+            / (F('review_count') + (count_delta + weight))
+        ),
+        output_field=FloatField(),
+    )
+
+
+def _average(review_count, score_sum, prior=(0, 0)):
+    """То же, что _average_expression, для значений в Python."""
+    if not review_count:
+        return None
+    mean, weight = prior
+    return (score_sum + mean * weight) / (review_count + weight)
+
+
+def score_histogram(title):
+    """Число отзывов произведения с каждой оценкой."""
+    return {
+        score: getattr(title, field_name)
+        for score, field_name in SCORE_COUNT_FIELDS.items()
+    }
+
+
+def histogram_median(histogram):
+    """Медиана оценок по гистограмме, без чтения отзывов; None без
+    отзывов. При чётном числе отзывов — среднее двух средних оценок."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    middle = ((total - 1) // 2, total // 2)
+    found = []
+    seen = 0
+    for score in sorted(histogram):
+        seen += histogram[score]
+        while len(found) < 2 and middle[len(found)] < seen:
+            found.append(score)
+    return sum(found) / 2
+
+
+def _field_names(title_model):
+    return {field.name for field in title_model._meta.get_fields()}
+
+
+def apply_score_delta(title_model, title_id, added=None, removed=None):
+    """Добавляет к счётчикам произведения оценку `added` и вычитает
+    `removed` одним UPDATE на стороне базы, без чтения строки в Python.
+    """
+    if added == removed:
+        return
+    count_delta = (added is not None) - (removed is not None)
+    sum_delta = (added or 0) - (removed or 0)
+    values = {
+        'review_count': F('review_count') + count_delta,
+        'score_sum': F('score_sum') + sum_delta,
+        'rating': _average_expression(count_delta, sum_delta),
+        'weighted_rating': _average_expression(
+            count_delta, sum_delta, get_prior()
+        ),
+    }
+    for score, delta in ((added, 1), (removed, -1)):
+        if score is not None:
+            field_name = SCORE_COUNT_FIELDS[score]
+            values[field_name] = F(field_name) + delta
+    title_model.objects.filter(pk=title_id).update(**values)
+
+
+def _aggregate(review_model, histogram, title_ids=None):
+    """Счётчики всех произведений с отзывами (или только `title_ids`)
+    одним проходом по таблице отзывов (GROUP BY title_id)."""
+    counts = {
+        field_name: Count('pk', filter=Q(score=score))
+        for score, field_name in SCORE_COUNT_FIELDS.items()
+    } if histogram else {}
+    reviews = review_model.objects.all()
+    if title_ids is not None:
+        reviews = reviews.filter(title_id__in=title_ids)
+    return (
+        reviews
+        .order_by()
+        .values('title_id')
+        .annotate(review_count=Count('pk'), score_sum=Sum('score'), **counts)
+    )
+
+
+def rebuild_ratings(title_model, review_model, title_ids=None):
+    """Пересчитывает счётчики всех произведений (или только
+    `title_ids`): агрегаты отзывов читаются одним GROUP BY, произведения
+    без отзывов обнуляются одним UPDATE, остальные записываются одним
+    executemany."""
+    fields = _field_names(title_model)
+    histogram = set(SCORE_COUNT_FIELDS.values()) <= fields
+    weighted = 'weighted_rating' in fields
+    prior = get_prior()
+    columns = ['review_count', 'score_sum', 'rating']
+    if weighted:
+        columns.append('weighted_rating')
+    if histogram:
+        columns.extend(SCORE_COUNT_FIELDS.values())
+    rows = []
+    for row in _aggregate(review_model, histogram, title_ids).iterator():
+        row['rating'] = _average(row['review_count'], row['score_sum'])
+        row['weighted_rating'] = _average(
+            row['review_count'], row['score_sum'], prior
+        )
+        rows.append([row[column] for column in columns] + [row['title_id']])
+    quote = connection.ops.quote_name
+    model_fields = title_model._meta
+    update = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(model_fields.db_table),
+        ', '.join(
+            f'{quote(model_fields.get_field(column).column)} = %s'
+            for column in columns
+        ),
+        quote(model_fields.pk.column),
+    )
+    titles = title_model.objects.all()
+    if title_ids is not None:
+        titles = titles.filter(pk__in=title_ids)
+    with transaction.atomic():
+        titles.update(**{
+            column: None if column.endswith('rating') else 0
+            for column in columns
+        })
+        with connection.cursor() as cursor:
+            cursor.executemany(update, rows)
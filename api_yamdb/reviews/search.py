@@ -0,0 +1,148 @@
+"""Полнотекстовый поиск произведений по названию и описанию.
+
+На SQLite используется виртуальная таблица FTS5, которую синхронизируют
+триггеры на reviews_title, поэтому индекс остаётся актуальным и при
+bulk_create, и при update() в обход сигналов. На PostgreSQL поиск идёт
+по tsvector-выражению, покрытому GIN-индексом. На остальных СУБД
+остаётся поиск подстроки без ранжирования.
+"""
+import re
+from functools import lru_cache
+
+from django.db import connection, connections
+from django.db.models import Q
+
+FTS_TABLE = 'reviews_title_fts'
+TS_CONFIG = 'simple'
+TS_DOCUMENT = (
+    f"to_tsvector('{TS_CONFIG}', coalesce(reviews_title.name, '') || ' ' "
+    f"|| coalesce(reviews_title.description, ''))"
+)
+TS_WEIGHTED = (
+    f"setweight(to_tsvector('{TS_CONFIG}', "
+    f"coalesce(reviews_title.name, '')), 'A') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', "
+    f"coalesce(reviews_title.description, '')), 'B')"
+)
+# Совпадение в названии весит больше совпадения в описании.
+FTS_NAME_WEIGHT = 10.0
+FTS_DESCRIPTION_WEIGHT = 1.0
+
+SQLITE_CREATE = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"name, description, tokenize='unicode61')",
+    f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON reviews_title BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, description) "
+    f"VALUES (new.id, new.name, new.description); END",
+    f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON reviews_title BEGIN "
+    f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END",
+    f"CREATE TRIGGER {FTS_TABLE}_au "
+    f"AFTER UPDATE OF id, name, description ON reviews_title BEGIN "
+    f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, description) "
+    f"VALUES (new.id, new.name, new.description); END",
+)
+SQLITE_DROP = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+SQLITE_REBUILD = (
+    f'DELETE FROM {FTS_TABLE}',
+    f'INSERT INTO {FTS_TABLE}(rowid, name, description) '
+    f'SELECT id, name, description FROM reviews_title',
+)
+POSTGRES_CREATE = (
+    f'CREATE INDEX IF NOT EXISTS title_search_idx '
+    f'ON reviews_title USING GIN (({TS_DOCUMENT}))',
+)
+POSTGRES_DROP = ('DROP INDEX IF EXISTS title_search_idx',)
+
+
+@lru_cache(maxsize=None)
+def _sqlite_has_fts5(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any('FTS5' in row[0] for row in cursor.fetchall())
+
+
+def fts5_available(db_connection):
+    return (
+        db_connection.vendor == 'sqlite'
+        and _sqlite_has_fts5(db_connection.alias)
+    )
+
+
+def _statements(db_connection, sqlite, postgres):
+    if fts5_available(db_connection):
+        return sqlite
+    if db_connection.vendor == 'postgresql':
+        return postgres
+    return ()
+
+
+def _execute(db_connection, statements):
+    with db_connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def install(db_connection=connection):
+    """Создаёт поисковый индекс и заполняет его текущими произведениями."""
+    _execute(
+        db_connection,
+        _statements(db_connection, SQLITE_CREATE, POSTGRES_CREATE)
+    )
+    rebuild(db_connection)
+
+
+def uninstall(db_connection=connection):
+    _execute(
+        db_connection,
+        _statements(db_connection, SQLITE_DROP, POSTGRES_DROP)
+    )
+
+
+def rebuild(db_connection=connection):
+    """Перестраивает FTS5-таблицу с нуля; индекс PostgreSQL не требует
+    перестроения."""
+    _execute(db_connection, _statements(db_connection, SQLITE_REBUILD, ()))
+
+
+def _fts5_query(text):
+    """Каждое слово запроса — отдельный префиксный терм в кавычках,
+    чтобы операторы FTS5 во вводе пользователя не интерпретировались."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+def search_titles(queryset, text):
+    """Фильтрует произведения по запросу и упорядочивает по релевантности."""
+    db_connection = connections[queryset.db]
+    if not re.search(r'\w', text):
+        return queryset.none()
+    if fts5_available(db_connection):
+        rank = (
+            f'bm25({FTS_TABLE}, '
+            f'{FTS_NAME_WEIGHT}, {FTS_DESCRIPTION_WEIGHT})'
+        )
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = reviews_title.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[_fts5_query(text)],
+            select={'search_rank': rank},
+        ).order_by('search_rank', 'id')
+    if db_connection.vendor == 'postgresql':
+        query = f"plainto_tsquery('{TS_CONFIG}', %s)"
+        return queryset.extra(
+            where=[f'{TS_DOCUMENT} @@ {query}'],
+            params=[text],
+            select={'search_rank': f'ts_rank({TS_WEIGHTED}, {query})'},
+            select_params=[text],
+        ).order_by('-search_rank', 'id')
+    return queryset.filter(
+        Q(name__icontains=text) | Q(description__icontains=text)
+    )
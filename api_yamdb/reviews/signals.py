@@ -0,0 +1,144 @@
+import threading
+
+from django.core.signals import request_started
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from .models import GenreRanking, Review, Title, User
+from .rankings import chunks, refresh_scores, sync_titles
+from .ratings import apply_score_delta, rebuild_ratings
+
+# Поля отзыва, от которых зависит рейтинг произведения.
+RATING_FIELDS = frozenset(('title', 'title_id', 'score'))
+
+# Объекты, которые удаляются прямо сейчас: (модель, pk). Их зависимые
+# строки удаляются каскадом и не пересчитывают рейтинг и версии по
+# одной — это делает родитель один раз.
+_deleting = threading.local()
+
+
+def _marks():
+    if not hasattr(_deleting, 'marks'):
+        _deleting.marks = set()
+    return _deleting.marks
+
+
+@receiver(request_started)
+def forget_deletions(**kwargs):
+    # Отметки снимает post_delete; если удаление упало, они не должны
+    # пережить запрос.
+    _marks().clear()
+
+
+def deleted_with_parent(instance):
+    """Удаляется ли объект каскадом вместе с объектом, на который
+    ссылается."""
+    marks = _marks()
+    return bool(marks) and any(
+        (field.related_model, getattr(instance, field.attname)) in marks
+        for field in instance._meta.concrete_fields
+        if field.many_to_one
+    )
+
+
+@receiver(pre_delete, sender=Title)
+@receiver(pre_delete, sender=Review)
+@receiver(pre_delete, sender=User)
+def mark_deleting(sender, instance, **kwargs):
+    _marks().add((sender, instance.pk))
+    if sender is User:
+        instance._reviewed_title_ids = set(
+            Review.objects.filter(author=instance)
+            .values_list('title_id', flat=True)
+        )
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=User)
+def unmark_deleting(sender, instance, **kwargs):
+    _marks().discard((sender, instance.pk))
+
+
+def _changes_rating(update_fields):
+    return update_fields is None or not RATING_FIELDS.isdisjoint(
+        update_fields
+    )
+
+
+@receiver(pre_save, sender=Review)
+def review_saving(sender, instance, raw=False, update_fields=None,
+                  **kwargs):
+    """Запоминает прежние title_id и score изменяемого отзыва, если он
+    загружен без них."""
+    if raw or instance._state.adding or not _changes_rating(update_fields):
+        return
+    instance.load_rating_values()
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, update_fields=None,
+                 **kwargs):
+    """Обновляет рейтинг произведения после создания или правки отзыва."""
+    if raw or not _changes_rating(update_fields):
+        return
+    old_title_id, old_score = instance.loaded_rating_values()
+    if created:
+        apply_score_delta(Title, instance.title_id, added=instance.score)
+    elif old_title_id != instance.title_id:
+        apply_score_delta(Title, old_title_id, removed=old_score)
+        apply_score_delta(Title, instance.title_id, added=instance.score)
+        refresh_scores([old_title_id])
+    else:
+        apply_score_delta(
+            Title, instance.title_id, added=instance.score, removed=old_score
+        )
+    refresh_scores([instance.title_id])
+    instance.remember_rating_values()
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Вычитает удалённый отзыв из рейтинга произведения. Отзывы
+    удалённого произведения не учитываются, отзывы удалённого автора
+    пересчитывает user_deleted."""
+    if deleted_with_parent(instance):
+        return
+    title_id, score = instance.loaded_rating_values()
+    if title_id is None:
+        title_id, score = instance.title_id, instance.score
+    apply_score_delta(Title, title_id, removed=score)
+    refresh_scores([title_id])
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """Пересчитывает рейтинги произведений с отзывами удалённого
+    пользователя: одним GROUP BY на порцию, а не по отзыву."""
+    for title_ids in chunks(getattr(instance, '_reviewed_title_ids', ())):
+        rebuild_ratings(Title, Review, title_ids)
+        refresh_scores(title_ids)
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, raw=False, **kwargs):
+    """Пересоздаёт строки рейтингов: могли смениться категория или год."""
+    if not raw:
+        sync_titles([instance.pk])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        sync_titles([instance.pk])
+    elif pk_set:
+        sync_titles(pk_set)
+    elif action == 'post_clear':
+        # genre.titles.clear(): затронутые произведения уже не найти
+        # через связь, удаляем строки жанра целиком.
+        GenreRanking.objects.filter(genre=instance).delete()
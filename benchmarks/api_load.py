@@ -0,0 +1,637 @@
+"""Нагрузочный прогон всех маршрутов API.
+
+    python -m benchmarks.api_load --titles 100000 --reviews 5000000 \\
+        --comments 10000000 --database /tmp/yamdb-bench.sqlite3 --keep
+    python -m benchmarks.api_load --database /tmp/yamdb-bench.sqlite3 \\
+        --no-seed --concurrency 8 --requests 500 --output report.json
+
+Синтетические данные создаются через те же модели (bulk_create), затем
+каждый маршрут из api/urls.py опрашивается заданное число раз в
+`--concurrency` потоков: через тестовый клиент Django в процессе или,
+с `--base-url`, через HTTP к запущенному WSGI-серверу. Результат —
+JSON с p50/p95/p99, запросами в секунду и SQL-запросами на запрос
+(последнее только для прогона в процессе).
+"""
+import argparse
+import collections
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import QueryCounter, percentiles, report, setup_django
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def _batches(rows, size):
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def seed(titles, reviews, comments, batch_size, log):
+    """Создаёт данные с явными id: отзыв i относится к произведению
+    i % titles и написан пользователем i // titles, поэтому пара
+    (произведение, автор) уникальна без проверок."""
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+    from django.utils import timezone
+
+    from reviews.models import (
+        Category, Comment, Genre, Review, Title, User
+    )
+    from reviews.rankings import rebuild_rankings
+    from reviews.ratings import rebuild_ratings
+
+    # Отзывам нужны произведения, комментариям — отзывы.
+    if reviews and not titles or comments and not reviews:
+        log('отзывы без произведений и комментарии без отзывов '
+            'не создаются')
+    reviews = reviews if titles else 0
+    comments = comments if reviews else 0
+    users = max(reviews // max(titles, 1) + 1, 10)
+    password = make_password(None)
+    now = timezone.now()
+    rng = random.Random(0)
+    tables = (
+        (User, users, lambda i: User(
+            id=i + 1, username=f'user{i}', email=f'user{i}@yamdb.fake',
+            password=password, role=User.USER,
+        )),
+        (Category, 10, lambda i: Category(
+            id=i + 1, name=f'Категория {i}', slug=f'category-{i}'
+        )),
+        (Genre, 30, lambda i: Genre(
+            id=i + 1, name=f'Жанр {i}', slug=f'genre-{i}'
+        )),
+        (Title, titles, lambda i: Title(
+            id=i + 1, name=f'Произведение {i}', year=1900 + i % 120,
+            description=f'Описание произведения номер {i}',
+            category_id=i % 10 + 1,
+        )),
+        (Title.genre.through, titles * 2, lambda i: Title.genre.through(
+            id=i + 1, title_id=i // 2 + 1, genre_id=(i // 2 + i % 2) % 30 + 1
+        )),
+        (Review, reviews, lambda i: Review(
+            id=i + 1, title_id=i % titles + 1, author_id=i // titles + 1,
+            text=f'Отзыв {i}', score=rng.randint(1, 10), pub_date=now,
+        )),
+        (Comment, comments, lambda i: Comment(
+            id=i + 1, review_id=rng.randint(1, reviews),
+            author_id=i % users + 1,
+            text=f'Комментарий {i}', pub_date=now,
+        )),
+    )
+    for model, count, build in tables:
+        if not count:
+            continue
+        started = time.perf_counter()
+        with transaction.atomic():
+            for batch in _batches(map(build, range(count)), batch_size):
+                model.objects.bulk_create(batch)
+        log(f'{model._meta.db_table}: {count} строк за '
+            f'{time.perf_counter() - started:.1f} с')
+    rebuild_ratings(Title, Review)
+    rebuild_rankings()
+
+
+Scenario = namedtuple(
+    'Scenario', 'route name method url data role prepare',
+    defaults=(None,),
+)
+
+
+def api_routes():
+    """Пары (имя маршрута, метод) из api/urls.py. main() сверяет с ними
+    сценарии, чтобы новый маршрут не выпал из прогона."""
+    from django.urls import URLPattern
+
+    from api import urls
+
+    patterns = [
+        *urls.router_v1.urls,
+        *(pattern for pattern in urls.urlpatterns
+          if isinstance(pattern, URLPattern)),
+    ]
+    routes = set()
+    for pattern in patterns:
+        view = pattern.callback.cls
+        actions = getattr(pattern.callback, 'actions', None) or {
+            method: method for method in ('get', 'post', 'put', 'patch',
+                                          'delete')
+            if hasattr(view, method)
+        }
+        # HEAD обслуживает обработчик GET; DRF дописывает его в actions
+        # при первом запросе.
+        routes.update(
+            (pattern.name, method) for method in actions
+            if method in view.http_method_names and method != 'head'
+        )
+    return routes
+
+
+def missing_routes(scenarios):
+    return api_routes() - {(item.route, item.method) for item in scenarios}
+
+
+def prepared(create):
+    """(подготовка, следующий объект) для одноразовых объектов:
+    подготовка создаёт их до замера, каждый запрос берёт свой."""
+    items = collections.deque()
+    return (lambda count: items.extend(create(count))), items.popleft
+
+
+def target(create):
+    """(подготовка, объект) для одного объекта, который меняют все
+    запросы сценария."""
+    holder = []
+
+    def prepare(count):
+        holder[:] = create(1)
+    return prepare, lambda: holder[0]
+
+
+class LoadObjects:
+    """Создаёт через ORM объекты, которые сценарии меняют и удаляют.
+    `run` делает их имена уникальными между прогонами на одной базе."""
+
+    def __init__(self, sample, run):
+        self.sample = sample
+        self.run = run
+        self.counter = itertools.count()
+
+    def name(self, prefix='load'):
+        return f'{prefix}{self.run}x{next(self.counter)}'
+
+    def titles(self, count):
+        from reviews.models import Title
+
+        return [
+            Title.objects.create(
+                name=f'Нагрузка {self.run}', year=2000,
+                category_id=self.sample['category_id'],
+            ).pk
+            for _ in range(count)
+        ]
+
+    def reviews(self, count):
+        from reviews.models import Review
+
+        return [
+            (title_id, Review.objects.create(
+                title_id=title_id, author_id=self.sample['admin_id'],
+                text='Нагрузка', score=5,
+            ).pk)
+            for title_id in self.titles(count)
+        ]
+
+    def comments(self, count):
+        from reviews.models import Comment
+
+        return [
+            Comment.objects.create(
+                review_id=self.sample['review'],
+                author_id=self.sample['admin_id'], text='Нагрузка',
+            ).pk
+            for _ in range(count)
+        ]
+
+    def slugs(self, model, count):
+        slugs = [self.name('load-') for _ in range(count)]
+        model.objects.bulk_create(
+            model(name=f'Нагрузка {slug}', slug=slug) for slug in slugs
+        )
+        return slugs
+
+    def categories(self, count):
+        from reviews.models import Category
+
+        return self.slugs(Category, count)
+
+    def genres(self, count):
+        from reviews.models import Genre
+
+        return self.slugs(Genre, count)
+
+    def users(self, count):
+        from reviews.models import User
+
+        names = [self.name() for _ in range(count)]
+        User.objects.bulk_create(
+            User(username=name, email=f'{name}@yamdb.fake') for name in names
+        )
+        return names
+
+
+def scenarios(sample, run):
+    """Сценарии для всех маршрутов api/urls.py: (маршрут, имя, метод,
+    функция URL, функция данных, токен, подготовка). Подготовка
+    создаёт до начала замера объекты, которые запросы меняют или
+    удаляют.
+    """
+    objects = LoadObjects(sample, run)
+    title, review = sample['title'], sample['review']
+    reviews = f'/api/v1/titles/{title}/reviews/'
+    comments = f'{reviews}{review}/comments/'
+    genre, category = sample['genre'], sample['category']
+
+    def numbered(build):
+        return lambda: build(next(objects.counter))
+
+    titles_gone = prepared(objects.titles)
+    review_titles = prepared(objects.titles)
+    reviews_gone = prepared(objects.reviews)
+    comments_gone = prepared(objects.comments)
+    categories_gone = prepared(objects.categories)
+    genres_gone = prepared(objects.genres)
+    users_gone = prepared(objects.users)
+    title_edit = target(objects.titles)
+    review_edit = target(objects.reviews)
+    comment_edit = target(objects.comments)
+    user_edit = target(objects.users)
+
+    def title_data(number=0):
+        return {
+            'name': f'Нагрузка {run} {number}', 'year': 2000,
+            'genre': [genre], 'category': category,
+        }
+
+    def review_url():
+        title_id, review_id = review_edit[1]()
+        return f'/api/v1/titles/{title_id}/reviews/{review_id}/'
+
+    def review_gone_url():
+        title_id, review_id = reviews_gone[1]()
+        return f'/api/v1/titles/{title_id}/reviews/{review_id}/'
+
+    def user_data():
+        name = user_edit[1]()
+        return {'username': name, 'email': f'{name}@yamdb.fake',
+                'bio': 'Нагрузка'}
+
+    return (
+        Scenario('api-root', 'api-root', 'get', lambda: '/api/v1/',
+                 None, None),
+        Scenario('categories-list', 'categories-list', 'get',
+                 lambda: '/api/v1/categories/', None, None),
+        Scenario('categories-list', 'categories-create', 'post',
+                 lambda: '/api/v1/categories/',
+                 numbered(lambda number: {
+                     'name': f'Нагрузка {number}',
+                     'slug': f'load-{run}-new-{number}',
+                 }), 'admin'),
+        Scenario('categories-detail', 'categories-delete', 'delete',
+                 lambda: f'/api/v1/categories/{categories_gone[1]()}/',
+                 None, 'admin', categories_gone[0]),
+        Scenario('categories-titles', 'categories-titles', 'get',
+                 lambda: f'/api/v1/categories/{category}/titles/',
+                 None, None),
+        Scenario('genres-list', 'genres-list', 'get',
+                 lambda: '/api/v1/genres/', None, None),
+        Scenario('genres-list', 'genres-create', 'post',
+                 lambda: '/api/v1/genres/',
+                 numbered(lambda number: {
+                     'name': f'Нагрузка {number}',
+                     'slug': f'load-{run}-new-{number}',
+                 }), 'admin'),
+        Scenario('genres-detail', 'genres-delete', 'delete',
+                 lambda: f'/api/v1/genres/{genres_gone[1]()}/',
+                 None, 'admin', genres_gone[0]),
+        Scenario('genres-titles', 'genres-titles', 'get',
+                 lambda: f'/api/v1/genres/{genre}/titles/?ordering=-year',
+                 None, None),
+        Scenario('titles-list', 'titles-list', 'get',
+                 lambda: '/api/v1/titles/', None, None),
+        Scenario('titles-list', 'titles-filter', 'get',
+                 lambda: f'/api/v1/titles/?genre={genre}&year=2000',
+                 None, None),
+        Scenario('titles-list', 'titles-search', 'get',
+                 lambda: '/api/v1/titles/?search=произведение', None, None),
+        Scenario('titles-list', 'titles-create', 'post',
+                 lambda: '/api/v1/titles/', numbered(title_data), 'admin'),
+        Scenario('titles-detail', 'titles-detail', 'get',
+                 lambda: f'/api/v1/titles/{title}/', None, None),
+        Scenario('titles-detail', 'titles-update', 'put',
+                 lambda: f'/api/v1/titles/{title_edit[1]()}/',
+                 title_data, 'admin', title_edit[0]),
+        Scenario('titles-detail', 'titles-partial-update', 'patch',
+                 lambda: f'/api/v1/titles/{title_edit[1]()}/',
+                 lambda: {'description': 'Нагрузка'}, 'admin',
+                 title_edit[0]),
+        Scenario('titles-detail', 'titles-delete', 'delete',
+                 lambda: f'/api/v1/titles/{titles_gone[1]()}/',
+                 None, 'admin', titles_gone[0]),
+        Scenario('titles-stats', 'titles-stats', 'get',
+                 lambda: f'/api/v1/titles/{title}/stats/', None, None),
+        Scenario('titles-export', 'titles-export', 'get',
+                 lambda: f'/api/v1/titles/export/?genre={genre}&year=2000',
+                 None, None),
+        Scenario('titles-bulk', 'titles-bulk-create', 'post',
+                 lambda: '/api/v1/titles/bulk/',
+                 lambda: [title_data(number) for number in range(10)],
+                 'admin'),
+        Scenario('titles-bulk', 'titles-bulk-update', 'patch',
+                 lambda: '/api/v1/titles/bulk/',
+                 lambda: [{'id': title_edit[1](), 'year': 2001}],
+                 'admin', title_edit[0]),
+        Scenario('reviews-list', 'reviews-list', 'get',
+                 lambda: reviews, None, None),
+        Scenario('reviews-list', 'reviews-cursor', 'get',
+                 lambda: f'{reviews}?pagination=cursor', None, None),
+        Scenario('reviews-list', 'reviews-create', 'post',
+                 lambda: f'/api/v1/titles/{review_titles[1]()}/reviews/',
+                 lambda: {'text': 'Нагрузочный отзыв', 'score': 7},
+                 'user', review_titles[0]),
+        Scenario('reviews-detail', 'reviews-detail', 'get',
+                 lambda: f'{reviews}{review}/', None, None),
+        Scenario('reviews-detail', 'reviews-update', 'put',
+                 review_url, lambda: {'text': 'Нагрузка', 'score': 6},
+                 'admin', review_edit[0]),
+        Scenario('reviews-detail', 'reviews-partial-update', 'patch',
+                 review_url, lambda: {'score': 8}, 'admin', review_edit[0]),
+        Scenario('reviews-detail', 'reviews-delete', 'delete',
+                 review_gone_url, None, 'admin', reviews_gone[0]),
+        Scenario('comments-list', 'comments-list', 'get',
+                 lambda: comments, None, None),
+        Scenario('comments-list', 'comments-create', 'post',
+                 lambda: comments,
+                 lambda: {'text': 'Нагрузочный комментарий'}, 'user'),
+        Scenario('comments-detail', 'comments-detail', 'get',
+                 lambda: f'{comments}{sample["comment"]}/', None, None),
+        Scenario('comments-detail', 'comments-update', 'put',
+                 lambda: f'{comments}{comment_edit[1]()}/',
+                 lambda: {'text': 'Нагрузка'}, 'admin', comment_edit[0]),
+        Scenario('comments-detail', 'comments-partial-update', 'patch',
+                 lambda: f'{comments}{comment_edit[1]()}/',
+                 lambda: {'text': 'Нагрузка'}, 'admin', comment_edit[0]),
+        Scenario('comments-detail', 'comments-delete', 'delete',
+                 lambda: f'{comments}{comments_gone[1]()}/',
+                 None, 'admin', comments_gone[0]),
+        Scenario('users-list', 'users-list', 'get',
+                 lambda: '/api/v1/users/', None, 'admin'),
+        Scenario('users-list', 'users-create', 'post',
+                 lambda: '/api/v1/users/',
+                 numbered(lambda number: {
+                     'username': f'load{run}n{number}',
+                     'email': f'load{run}n{number}@yamdb.fake',
+                 }), 'admin'),
+        Scenario('users-detail', 'users-detail', 'get',
+                 lambda: f'/api/v1/users/{sample["username"]}/',
+                 None, 'admin'),
+        Scenario('users-detail', 'users-update', 'put',
+                 lambda: f'/api/v1/users/{user_edit[1]()}/',
+                 user_data, 'admin', user_edit[0]),
+        Scenario('users-detail', 'users-partial-update', 'patch',
+                 lambda: f'/api/v1/users/{user_edit[1]()}/',
+                 lambda: {'bio': 'Нагрузка'}, 'admin', user_edit[0]),
+        Scenario('users-detail', 'users-delete', 'delete',
+                 lambda: f'/api/v1/users/{users_gone[1]()}/',
+                 None, 'admin', users_gone[0]),
+        Scenario('users-me', 'users-me', 'get',
+                 lambda: '/api/v1/users/me/', None, 'user'),
+        Scenario('users-me', 'users-me-update', 'patch',
+                 lambda: '/api/v1/users/me/',
+                 lambda: {'bio': 'Нагрузка'}, 'user'),
+        Scenario('user_creation-list', 'user_creation', 'post',
+                 lambda: '/api/v1/auth/signup/',
+                 numbered(_signup), None),
+        Scenario('get_token', 'get_token', 'post',
+                 lambda: '/api/v1/auth/token/',
+                 lambda: {'username': sample['username'],
+                          'confirmation_code': 'wrong'}, None),
+    )
+
+
+def _signup(number):
+    name = f'load{threading.get_ident()}x{number}'
+    return {'username': name, 'email': f'{name}@yamdb.fake'}
+
+
+def make_client(base_url, token):
+    if base_url:
+        import requests
+
+        session = requests.Session()
+        if token:
+            session.headers['Authorization'] = f'Bearer {token}'
+        return session
+    from django.test import Client
+
+    if token:
+        return Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return Client()
+
+
+def send(client, base_url, method, url, payload):
+    """Запрос с телом в JSON; потоковый ответ читается целиком."""
+    if base_url:
+        return getattr(client, method)(base_url + url, json=payload)
+    if payload is None:
+        response = getattr(client, method)(url)
+    else:
+        response = getattr(client, method)(
+            url, data=json.dumps(payload), content_type='application/json'
+        )
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def run_scenario(scenario, base_url, tokens, total, concurrency):
+    from django.db import connection
+
+    per_worker = [total // concurrency] * concurrency
+    for index in range(total % concurrency):
+        per_worker[index] += 1
+    if scenario.prepare:
+        scenario.prepare(total)
+
+    def worker(count):
+        client = make_client(base_url, tokens.get(scenario.role))
+        timings, errors = [], 0
+        with QueryCounter() as counter:
+            for _ in range(count):
+                payload = scenario.data() if scenario.data else None
+                url = scenario.url()
+                started = time.perf_counter()
+                try:
+                    response = send(
+                        client, base_url, scenario.method, url, payload
+                    )
+                except Exception:
+                    # Тестовый клиент пробрасывает исключения
+                    # представлений, сервер ответил бы 500.
+                    status = 500
+                else:
+                    status = getattr(response, 'status_code', 0)
+                timings.append(time.perf_counter() - started)
+                errors += status >= 500
+        connection.close()
+        return timings, errors, counter.count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(worker, per_worker))
+    elapsed = time.perf_counter() - started
+    timings = [timing for result in results for timing in result[0]]
+    return {
+        'requests': len(timings),
+        'errors': sum(result[1] for result in results),
+        'requests_per_sec': round(len(timings) / elapsed, 1),
+        'latency_ms': percentiles(timings),
+        'queries_per_request': (
+            None if base_url
+            else round(sum(result[2] for result in results)
+                       / max(len(timings), 1), 2)
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--titles', type=int, default=1000)
+    parser.add_argument('--reviews', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--database', help='Файл SQLite для данных')
+    parser.add_argument('--no-seed', action='store_true',
+                        help='Использовать уже заполненную --database')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Запросов на каждый маршрут')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--base-url',
+                        help='Адрес запущенного сервера, например '
+                             'http://127.0.0.1:8000')
+    parser.add_argument('--cache', choices=CACHE_BACKENDS, default='locmem')
+    parser.add_argument('--routes', nargs='*',
+                        help='Прогнать только перечисленные маршруты')
+    parser.add_argument('--output', help='Файл для JSON-отчёта')
+    parser.add_argument('--keep', action='store_true',
+                        help='Не удалять временную базу')
+    args = parser.parse_args()
+    if args.no_seed and not args.database:
+        parser.error('--no-seed требует --database')
+
+    database = setup_django(args.database, CACHE_BACKENDS[args.cache])
+    missing = missing_routes(scenarios(collections.defaultdict(int), ''))
+    if missing:
+        parser.error('нет сценариев для маршрутов: ' + ', '.join(
+            f'{method.upper()} {route}' for route, method in sorted(missing)
+        ))
+    from django.conf import settings
+
+    # Бенчмарк работает в одном процессе, поэтому locmem здесь общий.
+    settings.API_CACHE_RESPONSES = args.cache == 'locmem'
+
+    def log(line):
+        print(line, file=sys.stderr, flush=True)
+
+    try:
+        if not args.no_seed:
+            seed(args.titles, args.reviews, args.comments,
+                 args.batch_size, log)
+        result = benchmark(args)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                json.dump(result, output, ensure_ascii=False, indent=2)
+        report(result)
+    finally:
+        if not args.keep and not args.database:
+            os.remove(database)
+
+
+def sample_objects(admin):
+    """Объекты для адресов с id. Чего нет в базе (например, после
+    --comments 0), создаётся."""
+    from reviews.models import Category, Comment, Genre, Review, Title, User
+
+    category = (
+        Category.objects.order_by('id').first()
+        or Category.objects.create(name='Нагрузка', slug='load')
+    )
+    genre = (
+        Genre.objects.order_by('id').first()
+        or Genre.objects.create(name='Нагрузка', slug='load')
+    )
+    title = (
+        Title.objects.order_by('id').first()
+        or Title.objects.create(name='Нагрузка', year=2000,
+                                category=category)
+    )
+    review = (
+        Review.objects.filter(title=title).order_by('id').first()
+        or Review.objects.create(title=title, author=admin,
+                                 text='Нагрузка', score=5)
+    )
+    comment = (
+        Comment.objects.filter(review=review).order_by('id').first()
+        or Comment.objects.create(review=review, author=admin,
+                                  text='Нагрузка')
+    )
+    user = (
+        User.objects.filter(role=User.USER).order_by('id').first()
+        or User.objects.create(username='load-user',
+                               email='load-user@yamdb.fake')
+    )
+    return user, {
+        'title': title.pk, 'review': review.pk, 'comment': comment.pk,
+        'username': user.username, 'admin_id': admin.pk,
+        'genre': genre.slug, 'category': category.slug,
+        'category_id': category.pk,
+    }
+
+
+def benchmark(args):
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from reviews.models import Comment, Review, Title, User
+
+    admin, _ = User.objects.get_or_create(
+        username='load-admin',
+        defaults={'email': 'load-admin@yamdb.fake', 'role': User.ADMIN},
+    )
+    user, sample = sample_objects(admin)
+    tokens = {
+        'admin': str(AccessToken.for_user(admin)),
+        'user': str(AccessToken.for_user(user)),
+    }
+    routes = {}
+    for scenario in scenarios(sample, uuid.uuid4().hex[:8]):
+        if args.routes and scenario.name not in args.routes:
+            continue
+        routes[scenario.name] = run_scenario(
+            scenario, args.base_url, tokens, args.requests, args.concurrency
+        )
+    return {
+        'benchmark': 'api_load',
+        'dataset': {
+            'titles': Title.objects.count(),
+            'reviews': Review.objects.count(),
+            'comments': Comment.objects.count(),
+        },
+        'requests_per_route': args.requests,
+        'concurrency': args.concurrency,
+        'transport': 'http' if args.base_url else 'django-test-client',
+        'cache': args.cache,
+        'routes': routes,
+    }
+
+
+if __name__ == '__main__':
+    main()
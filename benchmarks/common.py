@@ -0,0 +1,84 @@
+"""Общая подготовка окружения для бенчмарков.
+
+Бенчмарки запускаются из корня репозитория, например
+`python -m benchmarks.review_write`, и работают на временной базе
+SQLite, чтобы не трогать db.sqlite3 разработчика.
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(ROOT_DIR, 'api_yamdb')
+
+
+def setup_django(database=None, cache_backend=None):
+    """Настраивает Django на отдельную базу и применяет миграции.
+
+    Возвращает путь к файлу базы.
+    """
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    import django
+    from django.conf import settings
+
+    if database is None:
+        handle, database = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+    settings.DATABASES['default']['NAME'] = database
+    settings.DEBUG = False
+    settings.MAIL_QUEUE = 'reviews.outbox.DatabaseMailQueue'
+    if cache_backend is not None:
+        settings.CACHES = {'default': {'BACKEND': cache_backend}}
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return database
+
+
+class QueryCounter:
+    """Считает SQL-запросы текущего потока через execute_wrapper.
+
+    CaptureQueriesContext здесь не подходит: каждый запрос тестового
+    клиента очищает connection.queries сигналом request_started.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        from django.db import connection
+
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+
+def percentiles(samples):
+    """p50/p95/p99 в миллисекундах."""
+    if not samples:
+        return {'p50': None, 'p95': None, 'p99': None}
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        ordered = ordered * 2
+    cuts = statistics.quantiles(ordered, n=100, method='inclusive')
+    return {
+        'p50': round(cuts[49] * 1000, 3),
+        'p95': round(cuts[94] * 1000, 3),
+        'p99': round(cuts[98] * 1000, 3),
+    }
+
+
+def report(result):
+    print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,107 @@
+"""Стоимость списка лучших произведений жанра в зависимости от размера
+каталога.
+
+    python -m benchmarks.rankings --titles 1000 10000 100000
+
+Для каждого размера каталог создаётся заново тем же seed, что и в
+api_load, в отдельном процессе на своей временной базе. Сравниваются
+первая страница `/api/v1/genres/<slug>/titles/` (с подсчётом числа
+произведений жанра и с `count=false`) и прежний способ — выборка
+произведений жанра с сортировкой по рейтингу через соединение с
+каталогом (только ORM, без HTTP-обработки). Кеш ответов отключён.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from .api_load import seed
+from .common import QueryCounter, percentiles, report, setup_django
+
+GENRE = 'genre-0'
+
+
+def ranked(client, params):
+    def request():
+        response = client.get(f'/api/v1/genres/{GENRE}/titles/', params)
+        assert response.status_code == 200, response.status_code
+    return request
+
+
+def join_sort():
+    from reviews.models import Title
+
+    list(
+        Title.objects.filter(genre__slug=GENRE)
+        .select_related('category')
+        .prefetch_related('genre')
+        .order_by('-rating', '-id')[:10]
+    )
+
+
+def measure(operation, repeat):
+    timings = []
+    with QueryCounter() as counter:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            operation()
+            timings.append(time.perf_counter() - started)
+    return {
+        'latency_ms': percentiles(timings),
+        'queries': counter.count // repeat,
+    }
+
+
+def run(titles, repeat):
+    database = setup_django(
+        cache_backend='django.core.cache.backends.dummy.DummyCache'
+    )
+    try:
+        from django.test import Client
+
+        seed(titles, titles * 2, 0, 5000,
+             lambda line: print(line, file=sys.stderr))
+        client = Client()
+        return {
+            'titles': titles,
+            'ranked': measure(ranked(client, {}), repeat),
+            'ranked_no_count': measure(
+                ranked(client, {'count': 'false'}), repeat
+            ),
+            'ranked_by_year': measure(
+                ranked(client, {'count': 'false', 'ordering': '-year'}),
+                repeat,
+            ),
+            'join_sort': measure(join_sort, repeat),
+        }
+    finally:
+        os.remove(database)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--titles', type=int, nargs='+', default=[1000, 10000, 100000]
+    )
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--run', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run(args.titles[0], args.repeat)))
+        return
+    results = []
+    for titles in args.titles:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.rankings', '--run',
+             '--titles', str(titles), '--repeat', str(args.repeat)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output))
+    report({'benchmark': 'rankings', 'genre': GENRE, 'results': results})
+
+
+if __name__ == '__main__':
+    main()
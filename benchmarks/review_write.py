@@ -0,0 +1,90 @@
+"""Пропускная способность записи отзывов через API.
+
+    python -m benchmarks.review_write --users 200 --titles 5
+
+Каждый пользователь пишет по отзыву на каждое произведение, затем
+повторяет запись, чтобы измерить путь дубликата (ответ 400). Для обоих
+путей выводятся отзывы в секунду, задержки и число SQL-запросов на
+запрос.
+"""
+import argparse
+import os
+import time
+
+from .common import QueryCounter, percentiles, report, setup_django
+
+
+def seed(users, titles):
+    from reviews.models import Category, Title, User
+
+    category = Category.objects.create(name='Фильм', slug='bench-movie')
+    User.objects.bulk_create(
+        User(username=f'bench{number}', email=f'bench{number}@yamdb.fake')
+        for number in range(users)
+    )
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {number}', year=2000, category=category)
+        for number in range(titles)
+    )
+    return (
+        list(User.objects.filter(username__startswith='bench')),
+        list(Title.objects.values_list('id', flat=True)),
+    )
+
+
+def measure(clients, title_ids, expected_status):
+    timings = []
+    started = time.perf_counter()
+    with QueryCounter() as counter:
+        for client in clients:
+            for title_id in title_ids:
+                request_started = time.perf_counter()
+                response = client.post(
+                    f'/api/v1/titles/{title_id}/reviews/',
+                    data={'text': 'Отзыв', 'score': 7},
+                )
+                timings.append(time.perf_counter() - request_started)
+                assert response.status_code == expected_status, (
+                    response.status_code, response.content
+                )
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(timings),
+        'requests_per_sec': round(len(timings) / elapsed, 1),
+        'latency_ms': percentiles(timings),
+        'queries_per_request': round(counter.count / len(timings), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--titles', type=int, default=5)
+    args = parser.parse_args()
+
+    database = setup_django()
+    try:
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        users, title_ids = seed(args.users, args.titles)
+        clients = []
+        for user in users:
+            client = APIClient()
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+            )
+            clients.append(client)
+        report({
+            'benchmark': 'review_write',
+            'users': args.users,
+            'titles': args.titles,
+            'create': measure(clients, title_ids, 201),
+            'duplicate': measure(clients, title_ids, 400),
+        })
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Скорость сериализации списков: сериализаторы DRF по объектам
+моделей против построения по строкам `.values()`.
+
+    python -m benchmarks.serializers --rows 5000 --repeat 5
+
+Каталог создаётся тем же seed, что и в api_load. Для произведений,
+отзывов и комментариев одна и та же выборка `--rows` строк
+сериализуется обоими способами: в замер входят запросы к базе (с
+select_related и prefetch_related для объектов) и построение данных
+ответа. Перед замером проверяется, что JSONRenderer отдаёт одинаковые
+байты. Выводятся строки в секунду и ускорение.
+"""
+import argparse
+import os
+import sys
+import time
+
+from .api_load import seed
+from .common import report, setup_django
+
+
+def cases(rows):
+    from api import serializers
+    from reviews.models import Comment, Review, Title
+
+    return {
+        'titles': (
+            serializers.TitleReadOnlySerializer,
+            Title.objects.select_related('category')
+            .prefetch_related('genre').order_by('id')[:rows],
+        ),
+        'reviews': (
+            serializers.ReviewSerializer,
+            Review.objects.select_related('author').order_by('id')[:rows],
+        ),
+        'comments': (
+            serializers.CommentSerializer,
+            Comment.objects.select_related('author').order_by('id')[:rows],
+        ),
+    }
+
+
+def objects(serializer_class, queryset):
+    return serializer_class(list(queryset.all()), many=True).data
+
+
+def values(serializer_class, queryset):
+    serializer = serializer_class()
+    rows = list(
+        queryset.prefetch_related(None).values(*serializer.values_paths())
+    )
+    return serializer.represent_rows(rows)
+
+
+def best_time(build, serializer_class, queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build(serializer_class, queryset)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    database = setup_django()
+    try:
+        from rest_framework.renderers import JSONRenderer
+
+        seed(args.rows, args.rows * 2, args.rows, 5000,
+             lambda line: print(line, file=sys.stderr))
+        render = JSONRenderer().render
+        results = {}
+        for name, (serializer_class, queryset) in cases(args.rows).items():
+            assert render(objects(serializer_class, queryset)) == render(
+                values(serializer_class, queryset)
+            ), f'{name}: JSON не совпадает'
+            seconds = {
+                build.__name__: best_time(
+                    build, serializer_class, queryset, args.repeat
+                )
+                for build in (objects, values)
+            }
+            results[name] = {
+                **{
+                    f'{build}_rows_per_sec': round(args.rows / elapsed)
+                    for build, elapsed in seconds.items()
+                },
+                'speedup': round(seconds['objects'] / seconds['values'], 1),
+            }
+        report({
+            'benchmark': 'serializers',
+            'rows': args.rows,
+            'results': results,
+        })
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
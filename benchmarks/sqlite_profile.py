@@ -0,0 +1,171 @@
+"""Конкурентные чтение и запись в SQLite до и после профиля для рабочих
+узлов (DATABASE_PROFILE=sqlite-production).
+
+    python -m benchmarks.sqlite_profile --readers 8 --writers 2 --seconds 5
+
+Читатели выполняют запросы страницы списка произведений, писатели в
+транзакции читают отзыв и добавляют к нему комментарий. После каждой
+операции соединение закрывается так же, как в конце HTTP-запроса, то
+есть только если CONN_MAX_AGE истёк. Каждый профиль запускается в
+отдельном процессе на своей временной базе; выводятся операции в
+секунду, задержки и число ошибок блокировки.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from .common import percentiles, report, setup_django
+
+PROFILES = ('default', 'sqlite-production')
+
+
+def seed(titles, reviews):
+    from reviews.models import Category, Review, Title, User
+
+    category = Category.objects.create(name='Фильм', slug='bench-movie')
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {number}', year=2000, category=category)
+        for number in range(titles)
+    )
+    User.objects.bulk_create(
+        User(username=f'bench{number}', email=f'bench{number}@yamdb.fake')
+        for number in range(reviews)
+    )
+    title = Title.objects.first()
+    Review.objects.bulk_create(
+        Review(title=title, author=user, text='Отзыв', score=7)
+        for user in User.objects.filter(username__startswith='bench')
+    )
+    return list(Review.objects.values_list('id', 'author_id'))
+
+
+def read(number):
+    from reviews.models import Title
+
+    queryset = Title.objects.select_related('category').order_by('-name')
+    queryset.count()
+    offset = number % 10 * 10
+    list(queryset[offset:offset + 10])
+
+
+def write(review):
+    from django.db import transaction
+
+    from reviews.models import Comment, Review
+
+    review_id, author_id = review
+    with transaction.atomic():
+        Review.objects.get(pk=review_id)
+        Comment.objects.create(
+            review_id=review_id, author_id=author_id, text='Комментарий'
+        )
+
+
+def worker(operation, arguments, deadline, results):
+    from django.db import OperationalError, close_old_connections
+
+    timings, errors, number = [], 0, 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            operation(arguments[number % len(arguments)])
+            timings.append(time.perf_counter() - started)
+        except OperationalError:
+            errors += 1
+        finally:
+            close_old_connections()
+        number += 1
+    close_old_connections()
+    results.append((timings, errors))
+
+
+def summarize(results, seconds):
+    timings = [timing for part, _ in results for timing in part]
+    return {
+        'ops_per_sec': round(len(timings) / seconds, 1),
+        'latency_ms': percentiles(timings),
+        'lock_errors': sum(errors for _, errors in results),
+    }
+
+
+def run(profile, args):
+    os.environ['DATABASE_PROFILE'] = profile
+    database = setup_django()
+    try:
+        from django.db import connection
+
+        reviews = seed(args.titles, args.reviews)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        connection.close()
+
+        deadline = time.perf_counter() + args.seconds
+        reads, writes = [], []
+        threads = [
+            threading.Thread(
+                target=worker,
+                args=(read, range(10), deadline, reads),
+            )
+            for _ in range(args.readers)
+        ] + [
+            threading.Thread(
+                target=worker,
+                args=(write, reviews, deadline, writes),
+            )
+            for _ in range(args.writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            'profile': profile,
+            'journal_mode': journal_mode,
+            'reads': summarize(reads, args.seconds),
+            'writes': summarize(writes, args.seconds),
+        }
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--profile', choices=PROFILES)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--titles', type=int, default=1000)
+    parser.add_argument('--reviews', type=int, default=100)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(run(args.profile, args)))
+        return
+    # Настройки Django читаются один раз, поэтому каждый профиль
+    # запускается в своём процессе.
+    results = []
+    for profile in PROFILES:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.sqlite_profile',
+             '--profile', profile, *sys.argv[1:]],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output))
+    report({
+        'benchmark': 'sqlite_profile',
+        'readers': args.readers,
+        'writers': args.writers,
+        'seconds': args.seconds,
+        'results': results,
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Скорость и память потоковой выгрузки /api/v1/titles/export/.
+
+    python -m benchmarks.title_export --titles 100000
+
+Каталог создаётся тем же seed, что и в api_load (по два жанра на
+произведение), затем выгрузка в каждом формате читается целиком.
+Выводятся строки в секунду, SQL-запросы и пик памяти Python во время
+чтения ответа — он не должен расти вместе с каталогом.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+from .api_load import seed
+from .common import QueryCounter, report, setup_django
+
+
+def export(client, export_format):
+    response = client.get('/api/v1/titles/export/', {'format': export_format})
+    return sum(len(chunk) for chunk in response.streaming_content)
+
+
+def measure(client, export_format, titles):
+    started = time.perf_counter()
+    with QueryCounter() as counter:
+        size = export(client, export_format)
+    elapsed = time.perf_counter() - started
+    # tracemalloc замедляет выполнение, поэтому память — вторым проходом.
+    tracemalloc.start()
+    export(client, export_format)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'rows_per_sec': round(titles / elapsed),
+        'seconds': round(elapsed, 2),
+        'megabytes': round(size / 2 ** 20, 1),
+        'queries': counter.count,
+        'peak_memory_mb': round(peak / 2 ** 20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=100000)
+    args = parser.parse_args()
+
+    database = setup_django()
+    try:
+        from django.test import Client
+
+        seed(args.titles, 0, 0, 5000,
+             lambda line: print(line, file=sys.stderr))
+        client = Client()
+        report({
+            'benchmark': 'title_export',
+            'titles': args.titles,
+            'ndjson': measure(client, 'ndjson', args.titles),
+            'csv': measure(client, 'csv', args.titles),
+        })
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
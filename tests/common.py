@@ -1,4 +1,8 @@
+from contextlib import contextmanager
+
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -24,6 +28,19 @@ def create_users_api(admin_client):
     return user, moderator
 
 
+@contextmanager
+def query_budget(max_queries, url=''):
+    """Проверяет, что блок кода выполняет не больше `max_queries` запросов к БД."""
+    with CaptureQueriesContext(connection) as context:
+        yield context
+    executed = len(context.captured_queries)
+    assert executed <= max_queries, (
+        f'Проверьте, что запрос `{url}` выполняет не больше {max_queries} запросов к БД, '
+        f'сейчас выполняется {executed}:\n'
+        + '\n'.join(query['sql'] for query in context.captured_queries)
+    )
+
+
 def auth_client(user):
     refresh = RefreshToken.for_user(user)
     client = APIClient()
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def immediate_mail_queue(settings):
+    """Письма отправляются сразу, чтобы их было видно в `mail.outbox`."""
+    settings.MAIL_QUEUE = 'reviews.outbox.ImmediateMailQueue'
@@ -334,3 +334,20 @@ class Test05ReviewAPI:
             'без токена авторизации возвращается статус 401'
         )
         self.check_permissions(user, 'обычного пользователя', reviews, titles)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_review_integrity_errors(self, admin_client, admin):
+        from django.db.utils import IntegrityError
+
+        from api.serializers import ReviewSerializer
+        from reviews.models import Title
+
+        _, titles, user, _ = create_reviews(admin_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        # Произведение удалено параллельно: ошибка внешнего ключа
+        # не должна выдаваться за повторный отзыв.
+        Title.objects.filter(pk=title.pk).delete()
+        with pytest.raises(IntegrityError):
+            ReviewSerializer().create({
+                'text': 'Отзыв', 'score': 5, 'title': title, 'author': user,
+            })
@@ -0,0 +1,129 @@
+import pytest
+from django.core.management import call_command
+
+from .common import auth_client, create_reviews, query_budget
+
+
+class Test08Rating:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_is_maintained(self, admin_client, admin):
+        from reviews.models import Title
+
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        title = Title.objects.get(id=titles[0]['id'])
+        assert (title.review_count, title.score_sum, title.rating) == (3, 12, 4), (
+            'Проверьте, что при создании отзыва обновляются `review_count`, `score_sum` и `rating`'
+        )
+
+        auth_client(user).patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/',
+            data={'score': 9}
+        )
+        title.refresh_from_db()
+        assert (title.review_count, title.score_sum, title.rating) == (3, 18, 6), (
+            'Проверьте, что при изменении оценки пересчитывается `rating`'
+        )
+
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/')
+        title.refresh_from_db()
+        assert (title.review_count, title.score_sum, title.rating) == (2, 13, 6.5), (
+            'Проверьте, что при удалении отзыва пересчитывается `rating`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rebuild_ratings(self, admin_client, admin):
+        from reviews.models import Title
+
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        Title.objects.update(rating=None, review_count=0, score_sum=0)
+        call_command('rebuild_ratings')
+        first = Title.objects.get(id=titles[0]['id'])
+        second = Title.objects.get(id=titles[1]['id'])
+        assert (first.review_count, first.score_sum, first.rating) == (3, 12, 4), (
+            'Проверьте, что команда `rebuild_ratings` пересчитывает счётчики отзывов'
+        )
+        assert (second.review_count, second.score_sum, second.rating) == (0, 0, None), (
+            'Проверьте, что у произведения без отзывов `rating` равен `None`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_cascade_delete(self):
+        from reviews.models import Comment, Review, Title, User
+
+        users = [
+            User.objects.create(username=f'cascade{number}',
+                                email=f'cascade{number}@yamdb.fake')
+            for number in range(50)
+        ]
+        title, other = (Title.objects.create(name=name)
+                        for name in ('Удаляемое', 'Другое'))
+        for user in users:
+            review = Review.objects.create(
+                title=title, author=user, text='Отзыв', score=5
+            )
+            Comment.objects.create(review=review, author=users[0], text='К')
+        Review.objects.create(title=other, author=users[0], text='О', score=4)
+        Review.objects.create(title=other, author=users[1], text='О', score=8)
+
+        with query_budget(20, 'удаление произведения'):
+            title.delete()
+        assert not Comment.objects.exists()
+        with query_budget(30, 'удаление пользователя'):
+            users[0].delete()
+        other.refresh_from_db()
+        assert (other.review_count, other.score_sum, other.rating) == (
+            1, 8, 8
+        ), (
+            'Проверьте, что удаление автора пересчитывает рейтинги '
+            'произведений с его отзывами'
+        )
+        Review.objects.get(author=users[1]).delete()
+        other.refresh_from_db()
+        assert (other.review_count, other.rating) == (0, None), (
+            'Проверьте, что отметки каскадного удаления снимаются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_commands_change_etags(self, client, admin_client, admin):
+        from reviews.models import Review
+
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        etag = client.get(url)['ETag']
+        Review.objects.update(score=1)
+        call_command('rebuild_ratings')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response.json()['rating'] == 1, (
+            'Проверьте, что `rebuild_ratings` меняет `ETag` ответов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_save_deferred_review(self):
+        from reviews.models import Review, Title, User
+
+        author = User.objects.create(username='deferred', email='deferred@yamdb.fake')
+        title, other = (Title.objects.create(name=name)
+                        for name in ('Первое', 'Второе'))
+        review = Review.objects.create(title=title, author=author, text='Текст', score=4)
+
+        review = Review.objects.only('id', 'text').get(pk=review.pk)
+        review.text = 'Новый текст'
+        review.save()
+        title.refresh_from_db()
+        assert (title.review_count, title.score_sum) == (1, 4), (
+            'Проверьте, что правка отзыва, загруженного без оценки, не '
+            'считается новым отзывом'
+        )
+
+        review = Review.objects.only('id').get(pk=review.pk)
+        review.score = 8
+        review.title = other
+        review.save()
+        title.refresh_from_db()
+        other.refresh_from_db()
+        assert (title.review_count, title.score_sum) == (0, 0)
+        assert (other.review_count, other.score_sum) == (1, 8), (
+            'Проверьте, что прежние оценка и произведение отзыва, '
+            'загруженного без них, читаются из базы'
+        )
@@ -0,0 +1,39 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+class Test09LoadCsv:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_load_csv(self):
+        from reviews.models import Comment, Review, Title, User
+
+        call_command('load_csv', batch_size=7, stdout=StringIO())
+        assert User.objects.filter(username='bingobongo').exists(), (
+            'Проверьте, что команда `load_csv` загружает пользователей'
+        )
+        assert Title.objects.count() > 0 and Review.objects.count() > 0, (
+            'Проверьте, что команда `load_csv` загружает произведения и отзывы'
+        )
+        assert Comment.objects.filter(review_id=6).exists(), (
+            'Проверьте, что команда `load_csv` загружает комментарии'
+        )
+        review = Review.objects.get(id=1)
+        assert review.pub_date.year == 2019, (
+            'Проверьте, что команда `load_csv` сохраняет `pub_date` из файла'
+        )
+        title = Title.objects.get(id=review.title_id)
+        assert title.review_count == title.reviews.count(), (
+            'Проверьте, что после загрузки пересчитываются рейтинги произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_load_csv_changes_etags(self, client):
+        etag = client.get('/api/v1/titles/')['ETag']
+        call_command('load_csv', stdout=StringIO())
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что `load_csv` меняет `ETag` ответов'
+        )
@@ -0,0 +1,54 @@
+from io import StringIO
+
+import pytest
+
+from .common import create_comments, create_reviews, create_titles, query_budget
+
+
+class Test10QueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_constant_queries(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        for number in range(8):
+            admin_client.post('/api/v1/titles/', data={
+                'name': f'Произведение {number}', 'year': 2000,
+                'genre': titles[0]['genre'], 'category': titles[0]['category'],
+            })
+
+        # Версии ресурсов, COUNT, произведения с категорией, жанры одним
+        # prefetch.
+        url = '/api/v1/titles/'
+        with query_budget(4, url):
+            response = client.get(url)
+        assert len(response.json()['results']) == 10
+
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        with query_budget(3, url):
+            response = client.get(url)
+        assert response.status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_query_plans_use_indexes(self, admin_client, admin):
+        from django.core.management import call_command
+
+        create_reviews(admin_client, admin)
+        call_command('check_query_plans', strict=True, stdout=StringIO())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_nested_parent_chain(self, client, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        # Версии ресурсов, отзыв вместе с произведением, COUNT,
+        # комментарии с авторами.
+        with query_budget(4, url):
+            response = client.get(url)
+        assert response.json()['count'] == len(comments)
+
+        url = f'/api/v1/titles/{titles[1]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        response = client.get(url)
+        assert response.status_code == 404, (
+            'Проверьте, что комментарии отзыва недоступны по адресу чужого произведения'
+        )
+        response = admin_client.post(url, data={'text': 'Мимо'})
+        assert response.status_code == 404
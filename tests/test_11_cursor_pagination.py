@@ -0,0 +1,55 @@
+import pytest
+
+from .common import create_titles, query_budget
+
+
+class Test11CursorPagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_cursor(self, client, admin_client, django_user_model):
+        from reviews.models import Review
+
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        for number in range(25):
+            author = django_user_model.objects.create_user(
+                username=f'reader{number}', email=f'reader{number}@yamdb.fake'
+            )
+            Review.objects.create(
+                title_id=title_id, author=author, text=str(number), score=5
+            )
+        # Одинаковая дата у всех отзывов: порядок задаётся вторым полем ключа.
+        pub_date = Review.objects.first().pub_date
+        Review.objects.update(pub_date=pub_date)
+
+        url = f'/api/v1/titles/{title_id}/reviews/?pagination=cursor'
+        seen = []
+        pages = []
+        while url:
+            with query_budget(3, url):
+                response = client.get(url)
+            assert response.status_code == 200
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что в режиме `pagination=cursor` не выполняется COUNT'
+            )
+            seen += [review['id'] for review in data['results']]
+            pages.append(data)
+            url = data['next']
+        assert seen == sorted(seen, reverse=True) and len(seen) == 25, (
+            'Проверьте, что курсорная пагинация отдаёт все отзывы ровно один раз'
+        )
+        assert pages[0]['previous'] is None
+
+        response = client.get(pages[-1]['previous'])
+        assert [review['id'] for review in response.json()['results']] == seen[10:20], (
+            'Проверьте, что ссылка `previous` возвращает предыдущую страницу'
+        )
+
+        response = client.get(f'/api/v1/titles/{title_id}/reviews/?pagination=cursor&cursor=broken')
+        assert response.status_code == 404
+
+        response = client.get(f'/api/v1/titles/{title_id}/reviews/')
+        assert response.json()['count'] == 25, (
+            'Проверьте, что без `pagination=cursor` используется постраничная пагинация'
+        )
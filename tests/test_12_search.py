@@ -0,0 +1,41 @@
+import pytest
+
+from .common import create_titles
+
+
+class Test12TitleSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_title_search(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Драма о пике', 'year': 2001, 'genre': [genres[2]['slug']],
+            'category': categories[1]['slug'], 'description': 'Без описания'
+        })
+
+        response = client.get('/api/v1/titles/?search=пике')
+        assert response.status_code == 200
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Драма о пике', titles[0]['name']], (
+            'Проверьте, что `?search=` ищет по названию и описанию, '
+            'и совпадение в названии выше совпадения в описании'
+        )
+
+        response = client.get('/api/v1/titles/?search=пово')
+        assert [title['id'] for title in response.json()['results']] == [titles[0]['id']], (
+            'Проверьте, что `?search=` находит произведение по началу слова'
+        )
+
+        admin_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'name': 'Новый проект'})
+        response = client.get('/api/v1/titles/?search=новый')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что поисковый индекс обновляется при изменении произведения'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[1]["id"]}/')
+        response = client.get('/api/v1/titles/?search=новый')
+        assert response.json()['count'] == 0, (
+            'Проверьте, что поисковый индекс обновляется при удалении произведения'
+        )
+
+        response = client.get('/api/v1/titles/?search="')
+        assert response.status_code == 200 and response.json()['count'] == 0
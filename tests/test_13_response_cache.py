@@ -0,0 +1,85 @@
+import pytest
+from django.test import override_settings
+
+from .common import auth_client, create_titles, create_users_api, query_budget
+
+
+@pytest.fixture(autouse=True)
+def response_cache(settings):
+    settings.API_CACHE_RESPONSES = True
+
+
+class Test13ResponseCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_cache_hit_and_invalidation(self, client, admin_client):
+        from api import cache
+
+        titles, categories, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        hits = cache.stats[('titles', 'hit')]
+        # Только версии ресурсов.
+        with query_budget(1, url):
+            response = client.get(url)
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный GET запрос отдаётся из кеша'
+        )
+        assert cache.stats[('titles', 'hit')] == hits + 1
+
+        user, _ = create_users_api(admin_client)
+        auth_client(user).post(f'{url}reviews/', data={'text': 'Ого', 'score': 8})
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS' and response.json()['rating'] == 8, (
+            'Проверьте, что новый отзыв сбрасывает кеш произведения'
+        )
+
+        client.get('/api/v1/titles/')
+        category = categories[0]['slug']
+        admin_client.delete(f'/api/v1/categories/{category}/')
+        response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что удаление категории сбрасывает кеш произведений'
+        )
+        assert all(title['category'] is None or title['category']['slug'] != category
+                   for title in response.json()['results'])
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_cache_key_depends_on_role(self, client, admin_client):
+        create_titles(admin_client)
+        client.get('/api/v1/genres/')
+        response = admin_client.get('/api/v1/genres/')
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что ключ кеша учитывает роль пользователя'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_disabled_by_setting(self, client, admin_client, settings):
+        create_titles(admin_client)
+        settings.API_CACHE_RESPONSES = False
+        client.get('/api/v1/genres/')
+        response = client.get('/api/v1/genres/')
+        assert 'X-Cache' not in response, (
+            'Проверьте, что кеш ответов выключается настройкой '
+            '`API_CACHE_RESPONSES`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_local_cache_shared_versions(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert client.get(url)['X-Cache'] == 'MISS'
+        # Запись в другом процессе: его locmem не общий с нашим.
+        other_worker = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'other-worker',
+        }}
+        with override_settings(CACHES=other_worker):
+            admin_client.patch(url, data={'name': 'Новое название'})
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что запись в другом процессе сбрасывает кеш '
+            'ответов и с locmem'
+        )
+        assert response.json()['name'] == 'Новое название'
@@ -0,0 +1,115 @@
+import pytest
+from django.test import override_settings
+
+from .common import auth_client, create_reviews, query_budget
+
+
+class Test14ConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_etag(self, client, admin_client, admin):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag and response.has_header('Last-Modified'), (
+            'Проверьте, что GET запрос возвращает заголовки `ETag` и `Last-Modified`'
+        )
+
+        # Произведение и версии ресурсов, без сериализации.
+        with query_budget(2, url):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что при совпадении `If-None-Match` возвращается статус 304'
+        )
+        assert response['ETag'] == etag
+
+        auth_client(user).patch(f'{url}{reviews[1]["id"]}/', data={'text': 'Передумал'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response['ETag'] != etag, (
+            'Проверьте, что изменение отзыва меняет `ETag` списка отзывов'
+        )
+
+        response = client.get(f'/api/v1/titles/{titles[1]["id"]}/reviews/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что `ETag` зависит от адреса запроса'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_etag(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        etag = client.get(url)['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        admin_client.delete(f'{url}reviews/{reviews[0]["id"]}/')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что удаление отзыва меняет `ETag` произведения'
+        )
+
+        reviews_etag = client.get(f'{url}reviews/')['ETag']
+        admin_client.delete(url)
+        response = client.get(f'{url}reviews/', HTTP_IF_NONE_MATCH=reviews_etag)
+        assert response.status_code == 404, (
+            'Проверьте, что после удаления произведения его отзывы не отдаются со статусом 304'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_versions_shared_between_processes(
+        self, client, admin_client, admin
+    ):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        etag = client.get(url)['ETag']
+        # Запись в другом процессе: его локальный кеш не общий с нашим.
+        other_worker = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'other-worker',
+        }}
+        with override_settings(CACHES=other_worker):
+            auth_client(user).patch(
+                f'{url}{reviews[1]["id"]}/', data={'text': 'Передумал'}
+            )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что `ETag` меняется после записи в другом процессе'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_if_none_match_any(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert client.get(url, HTTP_IF_NONE_MATCH='*').status_code == 304
+        response = client.get('/api/v1/titles/999999/', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 404, (
+            'Проверьте, что `If-None-Match: *` не даёт 304 для '
+            'несуществующего ресурса'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_reads_do_not_write_versions(self, client, admin_client, admin):
+        from reviews.models import ResourceVersion
+
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        before = set(ResourceVersion.objects.values_list('resource', 'version'))
+        for number in range(10):
+            response = client.get(
+                f'/api/v1/titles/{100000 + number}/reviews/1/comments/'
+            )
+            assert response.status_code == 404
+        response = client.get(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+            f'{reviews[0]["id"]}/comments/'
+        )
+        assert response.status_code == 200
+        assert set(
+            ResourceVersion.objects.values_list('resource', 'version')
+        ) == before, 'Проверьте, что GET-запросы не записывают версии'
+
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert not ResourceVersion.objects.filter(
+            resource=f'reviews:{titles[0]["id"]}'
+        ).exists(), (
+            'Проверьте, что версии удалённого произведения удаляются'
+        )
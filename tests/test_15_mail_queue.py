@@ -0,0 +1,145 @@
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+
+class Test15MailQueue:
+    url_signup = '/api/v1/auth/signup/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_enqueues_mail(self, client, settings):
+        from reviews.models import OutgoingEmail
+
+        settings.MAIL_QUEUE = 'reviews.outbox.DatabaseMailQueue'
+        outbox_before_count = len(mail.outbox)
+        for number in range(3):
+            response = client.post(self.url_signup, data={
+                'email': f'queued{number}@yamdb.fake', 'username': f'queued{number}'
+            })
+            assert response.status_code == 200
+        assert len(mail.outbox) == outbox_before_count, (
+            'Проверьте, что при регистрации письмо ставится в очередь, а не отправляется сразу'
+        )
+        assert OutgoingEmail.objects.count() == 3
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as open_connection:
+            call_command('send_queued_mail', batch_size=10)
+        assert open_connection.call_count == 1, (
+            'Проверьте, что пачка писем отправляется через одно соединение'
+        )
+        assert len(mail.outbox) == outbox_before_count + 3
+        assert 'queued0@yamdb.fake' in mail.outbox[outbox_before_count].to
+        assert not OutgoingEmail.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_failed_mail_is_retried(self, settings):
+        from reviews.models import OutgoingEmail
+        from reviews.outbox import DatabaseMailQueue, send_queued_mail
+
+        settings.MAIL_MAX_ATTEMPTS = 2
+        DatabaseMailQueue().enqueue('Тема', 'Текст', 'noreply@yamdb.fake', ['to@yamdb.fake'])
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=ConnectionError('relay is down')
+        ):
+            assert send_queued_mail() == (0, 1)
+        email = OutgoingEmail.objects.get()
+        assert email.attempts == 1 and not email.failed and 'relay is down' in email.last_error
+        assert send_queued_mail() == (0, 0), (
+            'Проверьте, что повторная попытка откладывается'
+        )
+
+        OutgoingEmail.objects.update(next_attempt=email.created)
+        outbox_before_count = len(mail.outbox)
+        assert send_queued_mail() == (1, 0)
+        assert len(mail.outbox) == outbox_before_count + 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_relay_down(self):
+        from reviews.models import OutgoingEmail
+        from reviews.outbox import DatabaseMailQueue
+
+        for number in range(2):
+            DatabaseMailQueue().enqueue(
+                'Тема', 'Текст', 'noreply@yamdb.fake', [f'{number}@yamdb.fake']
+            )
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.open',
+            side_effect=ConnectionRefusedError('relay is down')
+        ):
+            call_command('send_queued_mail')
+        emails = list(OutgoingEmail.objects.all())
+        assert len(emails) == 2 and all(
+            email.attempts == 1 and 'relay is down' in email.last_error
+            and email.next_attempt > timezone.now()
+            for email in emails
+        ), (
+            'Проверьте, что при недоступном SMTP-сервере вся пачка '
+            'откладывается, а команда не падает'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_send_outside_transaction(self):
+        from django.db import connection
+
+        from reviews.models import OutgoingEmail
+        from reviews.outbox import DatabaseMailQueue, send_queued_mail
+
+        DatabaseMailQueue().enqueue('Тема', 'Текст', 'noreply@yamdb.fake', ['to@yamdb.fake'])
+        seen = []
+
+        def send_messages(messages):
+            seen.append((
+                connection.in_atomic_block,
+                OutgoingEmail.objects.get().next_attempt > timezone.now(),
+            ))
+            return len(messages)
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=send_messages
+        ):
+            assert send_queued_mail() == (1, 0)
+        assert seen == [(False, True)], (
+            'Проверьте, что письма отправляются вне транзакции, а пачка '
+            'на время отправки забрана в аренду'
+        )
+        assert not OutgoingEmail.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_expired_lease(self):
+        from reviews.models import OutgoingEmail
+        from reviews.outbox import DatabaseMailQueue, send_queued_mail
+
+        for address in ('gone', 'reclaimed', 'sent'):
+            DatabaseMailQueue().enqueue(
+                'Тема', 'Текст', 'noreply@yamdb.fake', [f'{address}@yamdb.fake']
+            )
+        later = timezone.now() + timezone.timedelta(hours=1)
+
+        def send_messages(messages):
+            # Аренда истекла: другой воркер уже отправил одно письмо и
+            # забрал другое.
+            address = messages[0].to[0]
+            if address == 'gone@yamdb.fake':
+                OutgoingEmail.objects.filter(to=address).delete()
+                raise ConnectionError('timeout')
+            if address == 'reclaimed@yamdb.fake':
+                OutgoingEmail.objects.filter(to=address).update(next_attempt=later)
+                raise ConnectionError('timeout')
+            return len(messages)
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=send_messages
+        ):
+            assert send_queued_mail() == (1, 2)
+        email = OutgoingEmail.objects.get()
+        assert email.to == 'reclaimed@yamdb.fake' and email.attempts == 0, (
+            'Проверьте, что ошибка записывается только для писем, аренда '
+            'которых не истекла, а отправленные письма удаляются'
+        )
+        assert email.next_attempt == later
@@ -0,0 +1,53 @@
+import pytest
+from django.test import override_settings
+
+from .common import auth_client, query_budget
+
+
+class Test16AuthUserCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_user_lookup_is_cached(self, user, admin_client):
+        client = auth_client(user)
+        url = '/api/v1/users/me/'
+        client.get(url)
+        # Только версия пользователя.
+        with query_budget(1, url):
+            response = client.get(url)
+        assert response.json()['role'] == 'user'
+
+        response = client.get('/api/v1/users/')
+        assert response.status_code == 403
+
+        admin_client.patch(f'/api/v1/users/{user.username}/', data={'role': 'admin'})
+        response = client.get('/api/v1/users/')
+        assert response.status_code == 200, (
+            'Проверьте, что изменение роли пользователя сбрасывает кеш аутентификации'
+        )
+
+        user.refresh_from_db()
+        user.is_active = False
+        user.save()
+        response = client.get(url)
+        assert response.status_code == 401, (
+            'Проверьте, что заблокированный пользователь не проходит аутентификацию из кеша'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_changes_in_other_processes(self, user, admin_client):
+        client = auth_client(user)
+        url = '/api/v1/users/me/'
+        client.get(url)
+        # Блокировка в другом процессе: его локальный кеш не общий с нашим.
+        other_worker = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'other-worker',
+        }}
+        with override_settings(CACHES=other_worker):
+            user.is_active = False
+            user.save()
+        response = client.get(url)
+        assert response.status_code == 401, (
+            'Проверьте, что блокировка пользователя в другом процессе '
+            'видна со следующего запроса'
+        )
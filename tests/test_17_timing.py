@@ -0,0 +1,34 @@
+import pytest
+from django.test import Client
+
+from .common import create_reviews
+
+
+class Test17TimingMiddleware:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_server_timing(self, client, admin_client, admin, settings):
+        from api.instrumentation import RingBufferSink
+
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        assert not client.get(url).has_header('Server-Timing'), (
+            'Проверьте, что без API_TIMING_ENABLED замеры не выполняются'
+        )
+
+        settings.API_TIMING_ENABLED = True
+        settings.API_TIMING_SINKS = ('api.instrumentation.RingBufferSink',)
+        # Цепочка middleware собирается при первом запросе клиента.
+        response = Client().get(url)
+        header = response['Server-Timing']
+        for metric in ('db;', 'serialize;', 'render;', 'total;'):
+            assert metric in header, (
+                f'Проверьте, что заголовок `Server-Timing` содержит `{metric}`'
+            )
+        record = RingBufferSink.buffer[-1]
+        assert record['view'] == 'ReviewViewSet.list'
+        assert record['path'] == url and record['status'] == 200
+        assert record['queries'] == 4, (
+            'Проверьте, что замер учитывает все SQL-запросы запроса'
+        )
+        assert record['serialize_ms'] > 0 and record['render_ms'] > 0
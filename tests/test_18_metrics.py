@@ -0,0 +1,144 @@
+import json
+from unittest import mock
+
+import pytest
+
+from .common import create_reviews
+
+
+def sample(text, line_start):
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+class Test18Metrics:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_request_metrics(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        route = 'yamdb_http_requests_total{route="titles-list",method="GET"'
+        before = client.get('/metrics').content.decode()
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/')
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        text = response.content.decode()
+        key = route + ',status="200"}'
+        assert sample(text, key) - sample(before, key) == 2, (
+            'Проверьте, что `/metrics` считает запросы по маршрутам'
+        )
+        duration = 'yamdb_http_request_duration_seconds'
+        count = duration + '_count{route="titles-list"}'
+        assert sample(text, count) - sample(before, count) == 2
+        assert duration + '_bucket{route="titles-list",le="+Inf"} ' in text
+        assert 'yamdb_db_queries_per_request_sum{route="titles-list"}' in text
+        assert 'route="metrics"' not in text, (
+            'Проверьте, что запросы к самому `/metrics` не учитываются'
+        )
+        assert 'yamdb_mail_queue_depth{state="pending"} 0' in text
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_auth_and_signup(self, client):
+        before = client.get('/metrics').content.decode()
+        client.post('/api/v1/auth/signup/', data={
+            'username': 'metrics_user', 'email': 'metrics@yamdb.fake'
+        })
+        client.post('/api/v1/auth/token/', data={
+            'username': 'metrics_user', 'confirmation_code': 'wrong'
+        })
+        client.get('/api/v1/users/me/', HTTP_AUTHORIZATION='Bearer broken')
+        text = client.get('/metrics').content.decode()
+        for line in (
+            'yamdb_signups_total ',
+            'yamdb_auth_failures_total{reason="confirmation_code"}',
+            'yamdb_auth_failures_total{reason="token_not_valid"}',
+        ):
+            assert sample(text, line) - sample(before, line) == 1, (
+                f'Проверьте, что `/metrics` учитывает `{line.strip()}`'
+            )
+
+    def test_03_merge_processes(self, settings, tmp_path, monkeypatch):
+        from api import metrics
+
+        settings.METRICS_DIR = str(tmp_path)
+        registry = metrics.Registry()
+        monkeypatch.setattr(metrics, 'registry', registry)
+        monkeypatch.setattr(metrics, '_gauges', dict)
+        registry.inc('yamdb_signups_total', value=2)
+        registry.observe(
+            'yamdb_db_queries_per_request', ('titles-list',), 3,
+            metrics.QUERY_BUCKETS,
+        )
+        other = {
+            'counters': [['yamdb_signups_total', [], 5]],
+            'histograms': [['yamdb_db_queries_per_request', ['titles-list'], {
+                'buckets': list(metrics.QUERY_BUCKETS),
+                'counts': [0, 1] + [0] * (len(metrics.QUERY_BUCKETS) - 2),
+                'sum': 1,
+                'count': 1,
+            }]],
+        }
+        (tmp_path / '1-1.json').write_text(json.dumps(other))
+        registry.flush()
+        text = metrics.render()
+        assert 'yamdb_signups_total 7' in text, (
+            'Проверьте, что `/metrics` суммирует счётчики всех процессов'
+        )
+        prefix = 'yamdb_db_queries_per_request'
+        assert f'{prefix}_count{{route="titles-list"}} 2' in text
+        assert f'{prefix}_sum{{route="titles-list"}} 4' in text
+        assert f'{prefix}_bucket{{route="titles-list",le="1"}} 1' in text
+        assert f'{prefix}_bucket{{route="titles-list",le="3"}} 2' in text
+
+    def test_04_worker_files(self, settings, tmp_path, monkeypatch):
+        import os
+        import subprocess
+        import sys
+
+        from api import metrics
+
+        settings.METRICS_DIR = str(tmp_path)
+        registry = metrics.Registry()
+        monkeypatch.setattr(metrics, 'registry', registry)
+        monkeypatch.setattr(metrics, '_gauges', dict)
+        # Реестр создан в мастере (gunicorn --preload), пишет — воркер.
+        with mock.patch('os.getpid', return_value=4242):
+            registry.flush()
+        assert [path.name.split('-')[0] for path in tmp_path.iterdir()] == [
+            '4242'
+        ], 'Проверьте, что файл снимка называется по pid воркера'
+        for path in tmp_path.iterdir():
+            path.unlink()
+
+        worker = subprocess.Popen([sys.executable, '-c', ''])
+        worker.wait()
+        dead = {'counters': [['yamdb_signups_total', [], 3]],
+                'histograms': []}
+        (tmp_path / f'{worker.pid}-1.json').write_text(json.dumps(dead))
+        (tmp_path / f'{worker.pid}-1.tmp').write_text('{')
+        registry.inc('yamdb_signups_total')
+        assert 'yamdb_signups_total 4' in metrics.render()
+        assert not list(tmp_path.glob(f'{worker.pid}-*')), (
+            'Проверьте, что файлы завершившихся процессов удаляются'
+        )
+        assert 'yamdb_signups_total 4' in metrics.render(), (
+            'Проверьте, что счётчики завершившихся процессов сохраняются'
+        )
+        assert os.path.exists(tmp_path / metrics.ARCHIVE)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_io_errors(self, client, settings, tmp_path, monkeypatch):
+        from api import metrics
+
+        blocker = tmp_path / 'file'
+        blocker.write_text('')
+        settings.METRICS_DIR = str(blocker / 'metrics')
+        settings.METRICS_FLUSH_INTERVAL = 0
+        monkeypatch.setattr(metrics, 'registry', metrics.Registry())
+        assert client.get('/api/v1/genres/').status_code == 200, (
+            'Проверьте, что ошибка записи метрик не роняет запрос'
+        )
+        assert client.get('/metrics').status_code == 200
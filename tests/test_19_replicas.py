@@ -0,0 +1,175 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client
+
+from .common import auth_client
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    connections.databases['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.DATABASE_REPLICAS = ['replica']
+    yield 'replica'
+    connections['replica'].close()
+    del connections.databases['replica']
+    if hasattr(connections._connections, 'replica'):
+        delattr(connections._connections, 'replica')
+
+
+def genre_slugs(client, query=''):
+    response = client.get(f'/api/v1/genres/{query}')
+    assert response.status_code == 200
+    return {genre['slug'] for genre in response.json()['results']}
+
+
+class Test19Replicas:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reads_from_replica(self, replica, settings):
+        from reviews.models import Genre
+
+        Genre.objects.create(name='Старый', slug='old')
+        call_command('sync_sqlite_replicas', stdout=StringIO())
+        Genre.objects.create(name='Новый', slug='new')
+
+        settings.DATABASE_PIN_SECONDS = 60
+        client = Client()
+        response = client.get('/api/v1/genres/')
+        assert {genre['slug'] for genre in response.json()['results']} == {
+            'old'
+        }, (
+            'Проверьте, что GET-запросы читают с реплики, даже если '
+            'ресурс недавно изменился'
+        )
+        call_command('sync_sqlite_replicas', stdout=StringIO())
+        response = client.get(
+            '/api/v1/genres/', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что ETag строится по версиям с той же реплики, '
+            'что и данные'
+        )
+        assert genre_slugs(client) == {'old', 'new'}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_sticky_primary_after_write(self, replica, settings, admin):
+        call_command('sync_sqlite_replicas', stdout=StringIO())
+        client = auth_client(admin)
+        url = '/api/v1/genres/'
+
+        settings.DATABASE_PIN_SECONDS = 0
+        response = client.post(url, data={'name': 'Первый', 'slug': 'first'})
+        assert response.status_code == 201
+        assert genre_slugs(client) == set()
+
+        settings.DATABASE_PIN_SECONDS = 60
+        client.post(url, data={'name': 'Второй', 'slug': 'second'})
+        assert genre_slugs(client) == {'first', 'second'}, (
+            'Проверьте, что после записи пользователь читает '
+            'с основной базы'
+        )
+
+    def test_03_router(self, settings):
+        from api.replicas import (
+            LeastLatencySelector, ReplicaRouter, RoundRobinSelector
+        )
+        from reviews.models import Title
+
+        settings.DATABASE_REPLICAS = ['replica_1', 'replica_2']
+        router = ReplicaRouter()
+        assert router.db_for_read(Title) == 'default', (
+            'Проверьте, что вне запроса чтение идёт с основной базы'
+        )
+        assert router.db_for_write(Title) == 'default'
+        assert router.allow_migrate('replica_1', 'reviews') is False
+
+        selector = RoundRobinSelector(['replica_1', 'replica_2'])
+        assert [selector.choose() for _ in range(3)] == [
+            'replica_1', 'replica_2', 'replica_1'
+        ]
+        selector = LeastLatencySelector(['replica_1', 'replica_2'])
+        selector.record('replica_1', 0.02, 2)
+        assert selector.choose() == 'replica_2'
+        selector.record('replica_2', 0.09, 3)
+        assert selector.choose() == 'replica_1'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_only_api_routes(self, replica, user):
+        from unittest import mock
+
+        from rest_framework_simplejwt.authentication import (
+            JWTAuthentication
+        )
+
+        # Реплика пуста: любое чтение с неё упадёт без таблиц.
+        assert Client().get('/metrics').status_code == 200, (
+            'Проверьте, что `/metrics` читает с основной базы'
+        )
+        from reviews.models import User
+
+        staff = Client()
+        staff.force_login(User.objects.create_superuser(
+            'staff', 'staff@yamdb.fake', 'password'
+        ))
+        assert staff.get('/admin/reviews/title/').status_code == 200, (
+            'Проверьте, что админка читает с основной базы'
+        )
+
+        call_command('sync_sqlite_replicas', stdout=StringIO())
+        client = auth_client(user)
+        with mock.patch.object(
+            JWTAuthentication, 'get_validated_token',
+            autospec=True, side_effect=JWTAuthentication.get_validated_token
+        ) as validate:
+            assert client.get('/api/v1/users/me/').status_code == 200
+        assert validate.call_count == 1, (
+            'Проверьте, что токен проверяется один раз за запрос'
+        )
+
+    def test_05_check_in_fresh_interpreter(self):
+        import os
+        import subprocess
+        import sys
+
+        from django.conf import settings
+
+        # Порядок импорта в pytest другой: цикл импортов виден только
+        # в новом процессе, как у manage.py.
+        result = subprocess.run(
+            [sys.executable, '-c', (
+                'import django; django.setup(); '
+                'from django.core.management import call_command; '
+                'call_command("check")'
+            )],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE='api_yamdb.settings'),
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, (
+            'Проверьте, что `manage.py check` запускается: '
+            + result.stderr[-500:]
+        )
+
+    def test_06_pin_cache_check(self, settings):
+        from api.checks import check_replica_pin_cache
+
+        settings.DATABASE_REPLICAS = ['replica_1']
+        assert [
+            warning.id for warning in check_replica_pin_cache(None)
+        ] == ['api.W001'], (
+            'Проверьте, что отметки о записи в кеше процесса дают '
+            'предупреждение'
+        )
+        settings.CACHES = dict(settings.CACHES, pins={
+            'BACKEND': 'django.core.cache.backends.memcached.'
+                       'MemcachedCache',
+        })
+        settings.DATABASE_PIN_CACHE = 'pins'
+        assert check_replica_pin_cache(None) == []
@@ -0,0 +1,81 @@
+import sqlite3
+import threading
+from copy import deepcopy
+
+import pytest
+from django.db import OperationalError, connections, transaction
+
+
+@pytest.fixture
+def profile_db(settings, tmp_path, django_db_blocker):
+    path = str(tmp_path / 'profile.sqlite3')
+    connections.databases['profile'] = {
+        'ENGINE': 'api_yamdb.backends.sqlite3',
+        'NAME': path,
+        **deepcopy(settings.SQLITE_PRODUCTION_PROFILE),
+    }
+    with django_db_blocker.unblock():
+        with connections['profile'].cursor() as cursor:
+            cursor.execute('CREATE TABLE item (value integer)')
+        yield connections['profile'], path
+    connections['profile'].close()
+    del connections.databases['profile']
+    if hasattr(connections._connections, 'profile'):
+        delattr(connections._connections, 'profile')
+
+
+def lock_for(path, seconds):
+    """Держит блокировку записи из другого соединения."""
+    other = sqlite3.connect(path, check_same_thread=False)
+    other.execute('BEGIN IMMEDIATE')
+    timer = threading.Timer(seconds, other.commit)
+    timer.start()
+    return timer
+
+
+class Test20SQLiteProfile:
+
+    def test_01_pragmas(self, profile_db):
+        connection, _ = profile_db
+        with connection.cursor() as cursor:
+            for pragma, expected in (
+                ('journal_mode', 'wal'),
+                ('synchronous', 1),
+                ('cache_size', -64 * 1024),
+                ('temp_store', 2),
+            ):
+                cursor.execute(f'PRAGMA {pragma}')
+                assert cursor.fetchone()[0] == expected, (
+                    f'Проверьте, что профиль SQLite выставляет `{pragma}`'
+                )
+        raw = connection.connection
+        connection.close_if_unusable_or_obsolete()
+        assert connection.connection is raw, (
+            'Проверьте, что профиль SQLite переиспользует соединения'
+        )
+
+    def test_02_retry_on_lock(self, profile_db):
+        connection, path = profile_db
+        connection.settings_dict['OPTIONS']['timeout'] = 0.01
+        connection.close()
+        timer = lock_for(path, 0.2)
+        with connection.cursor() as cursor:
+            cursor.execute('INSERT INTO item VALUES (1)')
+        timer.join()
+
+        connection.cursor_class.retries = 0
+        timer = lock_for(path, 0.2)
+        with pytest.raises(OperationalError):
+            with connection.cursor() as cursor:
+                cursor.execute('INSERT INTO item VALUES (2)')
+        timer.join()
+
+    def test_03_immediate_transactions(self, profile_db):
+        connection, path = profile_db
+        other = sqlite3.connect(path, timeout=0)
+        with transaction.atomic(using='profile'):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT count(*) FROM item')
+            with pytest.raises(sqlite3.OperationalError):
+                other.execute('BEGIN IMMEDIATE')
+        other.close()
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+
+import pytest
+
+from .common import create_reviews
+
+URL = '/api/v1/titles/export/'
+
+
+def read_stream(response):
+    assert response.status_code == 200, (
+        f'Проверьте, что `{URL}` доступен без авторизации'
+    )
+    assert response.streaming, (
+        f'Проверьте, что `{URL}` отдаёт потоковый ответ'
+    )
+    return b''.join(response.streaming_content).decode()
+
+
+class Test21TitleExport:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_ndjson_matches_api(self, client, admin_client, admin,
+                                   monkeypatch):
+        from api.views import TitleViewSet
+
+        create_reviews(admin_client, admin)
+        # Порции по одному произведению проверяют переход между ними.
+        monkeypatch.setattr(TitleViewSet, 'export_chunk_size', 1)
+        response = client.get(URL)
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        exported = [
+            json.loads(line) for line in read_stream(response).splitlines()
+        ]
+        listed = sorted(
+            client.get('/api/v1/titles/').json()['results'],
+            key=lambda title: title['id'],
+        )
+        assert exported == listed, (
+            'Проверьте, что выгрузка содержит те же данные, что и список '
+            'произведений'
+        )
+
+        response = client.get(URL, {'genre': 'drama'})
+        exported = [
+            json.loads(line) for line in read_stream(response).splitlines()
+        ]
+        assert [title['name'] for title in exported] == ['Проект'], (
+            'Проверьте, что выгрузка поддерживает фильтры TitleFilter'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_csv(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        response = client.get(URL, {'format': 'csv'})
+        assert response['Content-Type'].startswith('text/csv')
+        rows = list(csv.reader(io.StringIO(read_stream(response))))
+        assert rows[0] == [
+            'id', 'name', 'year', 'description', 'category', 'genre',
+            'rating',
+        ]
+        assert rows[1] == [
+            str(titles[0]['id']), 'Поворот туда', '2000', 'Крутое пике',
+            'films', 'horror,comedy', '4.0',
+        ]
+        assert len(rows) == 3
+
+        response = client.get(URL, HTTP_ACCEPT='text/csv')
+        assert response['Content-Type'].startswith('text/csv'), (
+            'Проверьте, что формат выгрузки выбирается заголовком Accept'
+        )
+        rows = list(csv.reader(io.StringIO(read_stream(response))))
+        assert len(rows) == 3
+
+        response = client.get(URL, {'format': 'csv', 'genre': 'unknown'})
+        rows = list(csv.reader(io.StringIO(read_stream(response))))
+        assert len(rows) == 1, (
+            'Проверьте, что пустая выгрузка CSV содержит заголовок'
+        )
@@ -0,0 +1,156 @@
+import json
+
+import pytest
+
+from .common import (auth_client, create_categories, create_genre,
+                     create_users_api, query_budget)
+
+URL = '/api/v1/titles/bulk/'
+
+
+def post_json(client, method, data):
+    return getattr(client, method)(
+        URL, data=json.dumps(data), content_type='application/json'
+    )
+
+
+class Test22TitleBulk:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_create(self, admin_client):
+        create_genre(admin_client)
+        create_categories(admin_client)
+        data = [
+            {'name': f'Произведение {number}', 'year': 2000,
+             'genre': ['horror', 'drama'], 'category': 'films'}
+            for number in range(50)
+        ]
+        with query_budget(10, URL):
+            response = post_json(admin_client, 'post', data)
+        assert response.status_code == 201, (
+            f'Проверьте, что POST `{URL}` создаёт произведения пакетом'
+        )
+        results = response.json()
+        assert len(results) == 50 and all('id' in item for item in results)
+        titles = admin_client.get(
+            '/api/v1/titles/', {'name': 'Произведение 7'}
+        ).json()['results']
+        assert titles[0]['genre'] == [
+            {'name': 'Ужасы', 'slug': 'horror'},
+            {'name': 'Драма', 'slug': 'drama'},
+        ]
+        assert titles[0]['category']['slug'] == 'films'
+
+        response = post_json(admin_client, 'post', [
+            {'name': 'Верное', 'year': 2001, 'genre': [],
+             'category': 'books'},
+            {'name': 'Жанр', 'year': 2001, 'genre': ['unknown'],
+             'category': 'books'},
+            {'name': 'Год', 'year': 3000, 'genre': [], 'category': 'books'},
+            'не объект',
+        ])
+        assert response.status_code == 207, (
+            'Проверьте, что при частично неверном пакете возвращается 207'
+        )
+        results = response.json()
+        assert 'id' in results[0]
+        assert list(results[1]['errors']) == ['genre']
+        assert list(results[2]['errors']) == ['year']
+        assert 'errors' in results[3]
+        response = admin_client.get('/api/v1/titles/', {'year': 2001})
+        assert response.json()['count'] == 1, (
+            'Проверьте, что неверные элементы пакета не сохраняются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_bulk_update(self, admin_client):
+        create_genre(admin_client)
+        create_categories(admin_client)
+        created = post_json(admin_client, 'post', [
+            {'name': f'Произведение {number}', 'year': 2000,
+             'genre': ['horror'], 'category': 'films'}
+            for number in range(3)
+        ]).json()
+        response = post_json(admin_client, 'patch', [
+            {'id': created[0]['id'], 'year': 2010, 'genre': ['comedy']},
+            {'id': created[1]['id'], 'category': 'books'},
+            {'id': 100500, 'year': 2010},
+            {'year': 2010},
+        ])
+        assert response.status_code == 207
+        results = response.json()
+        assert list(results[2]['errors']) == ['id']
+        assert list(results[3]['errors']) == ['id']
+        first = admin_client.get(
+            f'/api/v1/titles/{created[0]["id"]}/'
+        ).json()
+        assert first['year'] == 2010
+        assert first['genre'] == [{'name': 'Комедия', 'slug': 'comedy'}]
+        second = admin_client.get(
+            f'/api/v1/titles/{created[1]["id"]}/'
+        ).json()
+        assert second['category']['slug'] == 'books'
+        assert second['genre'] == [{'name': 'Ужасы', 'slug': 'horror'}]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_bulk_permissions(self, client, admin_client):
+        user, _ = create_users_api(admin_client)
+        for anonymous_or_user in (client, auth_client(user)):
+            response = post_json(anonymous_or_user, 'post', [])
+            assert response.status_code in (401, 403), (
+                f'Проверьте, что `{URL}` доступен только администратору'
+            )
+        response = post_json(admin_client, 'post', {'name': 'Не список'})
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_ids_are_not_reused(self, admin_client):
+        from reviews.models import Title
+
+        create_categories(admin_client)
+        items = [
+            {'name': f'Произведение {number}', 'year': 2000,
+             'genre': [], 'category': 'films'}
+            for number in range(3)
+        ]
+        first = post_json(admin_client, 'post', items).json()
+        Title.objects.filter(id=first[-1]['id']).delete()
+        second = post_json(admin_client, 'post', items).json()
+        assert min(item['id'] for item in second) > first[-1]['id'], (
+            'Проверьте, что id удалённых произведений не выдаются повторно'
+        )
+        assert [
+            Title.objects.get(id=item['id']).name for item in second
+        ] == [item['name'] for item in items], (
+            'Проверьте, что в ответе id созданных произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_transaction_starts_with_write(self, admin_client):
+        from django.db import connection
+
+        create_genre(admin_client)
+        create_categories(admin_client)
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            if connection.in_atomic_block:
+                statements.append(sql.split(None, 1)[0].upper())
+            return execute(sql, params, many, context)
+
+        item = {'name': 'Произведение', 'year': 2000,
+                'genre': ['drama'], 'category': 'films'}
+        with connection.execute_wrapper(record):
+            created = post_json(admin_client, 'post', [item]).json()
+            first = len(statements)
+            post_json(admin_client, 'patch', [
+                {'id': created[0]['id'], 'genre': ['horror']}
+            ])
+        assert statements and first < len(statements)
+        assert {statements[0], statements[first]} <= {
+            'INSERT', 'UPDATE', 'DELETE'
+        }, (
+            'Проверьте, что проверки и чтения пакета выполняются до '
+            'транзакции: в SQLite транзакция, начатая чтением, не может '
+            'взять блокировку записи'
+        )
@@ -0,0 +1,89 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+
+def create_genres(admin_client, count):
+    for number in range(count):
+        admin_client.post('/api/v1/genres/', data={
+            'name': f'Жанр {number}', 'slug': f'genre-{number:02}'
+        })
+
+
+class Test23PageSize:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_page_size(self, client, admin_client, settings):
+        settings.API_CACHE_RESPONSES = True
+        create_genres(admin_client, 15)
+        response = client.get('/api/v1/genres/', {'page_size': 5})
+        data = response.json()
+        assert len(data['results']) == 5 and data['count'] == 15, (
+            'Проверьте, что размер страницы задаётся параметром `page_size`'
+        )
+        for value in ('all', '0'):
+            data = client.get(
+                '/api/v1/genres/', {'page_size': value}
+            ).json()
+            assert len(data['results']) == 15 and data['next'] is None, (
+                'Проверьте, что `page_size=all` отдаёт справочник целиком'
+            )
+        response = client.get('/api/v1/genres/', {'page_size': 'all'})
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что полный справочник отдаётся из кеша'
+        )
+
+        create_titles(admin_client)
+        data = client.get('/api/v1/titles/', {'page_size': 'all'}).json()
+        assert data['next'] is None and len(data['results']) == 2
+
+    def test_02_max_page_size(self, rf):
+        from rest_framework.request import Request
+
+        from api.pagination import LookupPagination, SizedPagination
+
+        def page_size(pagination, value):
+            request = Request(rf.get('/', {'page_size': value}))
+            return pagination().get_page_size(request)
+
+        assert page_size(SizedPagination, 50) == 50
+        assert page_size(SizedPagination, 100500) == 100, (
+            'Проверьте, что размер страницы ограничен сервером'
+        )
+        assert page_size(SizedPagination, 'all') == 10, (
+            'Проверьте, что `page_size=all` доступен только справочникам'
+        )
+        assert page_size(LookupPagination, 'all') == 1000
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_skip_count(self, client, admin_client):
+        create_genres(admin_client, 5)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(
+                '/api/v1/genres/', {'page_size': 2, 'count': 'false'}
+            )
+        data = response.json()
+        assert data['count'] is None
+        assert [genre['slug'] for genre in data['results']] == [
+            'genre-04', 'genre-03'
+        ]
+        assert 'count=false' in data['next'] and 'page=2' in data['next']
+        assert data['previous'] is None
+        assert not any(
+            'COUNT(' in query['sql'].upper()
+            for query in context.captured_queries
+        ), 'Проверьте, что `count=false` не выполняет запрос COUNT'
+
+        data = client.get(data['next']).json()
+        assert [genre['slug'] for genre in data['results']] == [
+            'genre-02', 'genre-01'
+        ]
+        assert data['previous'] and data['next']
+        data = client.get(data['next']).json()
+        assert len(data['results']) == 1 and data['next'] is None
+        response = client.get(
+            '/api/v1/genres/', {'page': 4, 'page_size': 2, 'count': 'false'}
+        )
+        assert response.status_code == 404
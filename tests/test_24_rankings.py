@@ -0,0 +1,131 @@
+import pytest
+from django.core.management import call_command
+
+from .common import auth_client, create_reviews, query_budget
+
+
+def ranked(client, url, **params):
+    response = client.get(url, params)
+    assert response.status_code == 200, (
+        f'Проверьте, что `{url}` доступен без токена'
+    )
+    return [title['name'] for title in response.json()['results']]
+
+
+def create_third_title(admin_client, user):
+    response = admin_client.post('/api/v1/titles/', data={
+        'name': 'Старый ужас', 'year': 1990, 'genre': ['horror'],
+        'category': 'films',
+    })
+    title_id = response.json()['id']
+    auth_client(user).post(
+        f'/api/v1/titles/{title_id}/reviews/', data={'text': 'Ух', 'score': 9}
+    )
+    return title_id
+
+
+class Test24Rankings:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_ordering(self, client, admin_client, admin):
+        _, titles, user, _ = create_reviews(admin_client, admin)
+        create_third_title(admin_client, user)
+
+        url = '/api/v1/genres/horror/titles/'
+        assert ranked(client, url) == ['Старый ужас', 'Поворот туда'], (
+            f'Проверьте, что `{url}` по умолчанию сортирует по убыванию '
+            'рейтинга'
+        )
+        assert ranked(client, url, ordering='year') == [
+            'Старый ужас', 'Поворот туда'
+        ]
+        assert ranked(client, url, ordering='-review_count') == [
+            'Поворот туда', 'Старый ужас'
+        ], 'Проверьте сортировку по `review_count`'
+        assert ranked(client, url, ordering='name') == [
+            'Старый ужас', 'Поворот туда'
+        ], 'Проверьте, что неизвестная сортировка заменяется на -rating'
+        assert ranked(client, '/api/v1/categories/books/titles/') == [
+            'Проект'
+        ]
+        response = client.get('/api/v1/genres/horror/titles/')
+        title = response.json()['results'][1]
+        assert title['rating'] == 4 and len(title['genre']) == 2, (
+            'Проверьте, что произведения отдаются в формате `/titles/`'
+        )
+        assert client.get(
+            '/api/v1/genres/unknown/titles/'
+        ).status_code == 404
+        assert ranked(
+            client, url, search='Не совпадает с названием жанра'
+        ) == ['Старый ужас', 'Поворот туда'], (
+            'Проверьте, что `?search=` списка жанров не скрывает жанр'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_incremental_refresh(self, client, admin_client, admin):
+        from reviews.models import CategoryRanking, GenreRanking
+
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        title_id = titles[0]['id']
+        admin_client.patch(
+            f'/api/v1/titles/{title_id}/reviews/{reviews[0]["id"]}/',
+            data={'score': 10},
+        )
+        rows = GenreRanking.objects.filter(title_id=title_id)
+        assert {(row.rating, row.review_count) for row in rows} == {
+            (17 / 3, 3)
+        }, 'Проверьте, что правка отзыва обновляет таблицу рейтингов'
+
+        admin_client.patch(
+            f'/api/v1/titles/{title_id}/',
+            data={'genre': ['drama'], 'category': 'books', 'year': 2001},
+        )
+        assert ranked(client, '/api/v1/genres/horror/titles/') == [], (
+            'Проверьте, что смена жанров обновляет таблицу рейтингов'
+        )
+        assert ranked(client, '/api/v1/categories/books/titles/') == [
+            'Поворот туда', 'Проект'
+        ], 'Проверьте, что смена категории обновляет таблицу рейтингов'
+        assert set(
+            CategoryRanking.objects.values_list('title_id', 'year')
+        ) == {(title_id, 2001), (titles[1]['id'], 2020)}
+
+        admin_client.delete(f'/api/v1/titles/{title_id}/')
+        assert not GenreRanking.objects.filter(title_id=title_id).exists()
+        admin_client.delete('/api/v1/genres/drama/')
+        assert not GenreRanking.objects.exists(), (
+            'Проверьте, что строки удалённого жанра удаляются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rebuild(self, client, admin_client, admin):
+        from reviews.models import CategoryRanking, GenreRanking
+
+        create_reviews(admin_client, admin)
+        expected = set(GenreRanking.objects.values_list(
+            'genre_id', 'title_id', 'rating', 'review_count', 'year'
+        ))
+        GenreRanking.objects.all().delete()
+        CategoryRanking.objects.update(rating=0)
+        call_command('rebuild_ratings')
+        assert set(GenreRanking.objects.values_list(
+            'genre_id', 'title_id', 'rating', 'review_count', 'year'
+        )) == expected, (
+            'Проверьте, что `rebuild_ratings` заполняет таблицы рейтингов'
+        )
+        assert ranked(client, '/api/v1/categories/films/titles/') == [
+            'Поворот туда'
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_queries(self, client, admin_client, admin, settings):
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        }}
+        _, _, user, _ = create_reviews(admin_client, admin)
+        create_third_title(admin_client, user)
+        url = '/api/v1/genres/horror/titles/'
+        with query_budget(6, url):
+            response = client.get(url, {'ordering': '-year'})
+        assert response.json()['count'] == 2
@@ -0,0 +1,100 @@
+import pytest
+from django.core.management import call_command
+
+from .common import create_reviews
+
+HISTOGRAM_FIELDS = tuple(f'score_{score}_count' for score in range(1, 11))
+COUNTERS = (
+    'review_count', 'score_sum', 'rating', 'weighted_rating',
+    *HISTOGRAM_FIELDS,
+)
+
+
+def histogram(**counts):
+    return {str(score): counts.get(f's{score}', 0) for score in range(1, 11)}
+
+
+class Test25WeightedRating:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_incremental(self, admin_client, admin, settings):
+        from reviews.models import Title
+
+        settings.RATING_PRIOR_MEAN = 5.5
+        settings.RATING_PRIOR_WEIGHT = 10
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        params = {'include': 'weighted_rating,score_histogram'}
+        data = admin_client.get(url, params).json()
+        assert data['weighted_rating'] == pytest.approx(67 / 13), (
+            'Проверьте, что `weighted_rating` — среднее оценок вместе с '
+            'RATING_PRIOR_WEIGHT оценками RATING_PRIOR_MEAN'
+        )
+        assert data['score_histogram'] == histogram(s3=1, s4=1, s5=1), (
+            'Проверьте, что `score_histogram` считает отзывы по оценкам'
+        )
+
+        admin_client.patch(
+            f'{url}reviews/{reviews[0]["id"]}/', data={'score': 10}
+        )
+        admin_client.delete(f'{url}reviews/{reviews[1]["id"]}/')
+        data = admin_client.get(url, params).json()
+        assert data['score_histogram'] == histogram(s4=1, s10=1), (
+            'Проверьте, что гистограмма обновляется при правке и удалении '
+            'отзыва'
+        )
+        assert data['weighted_rating'] == pytest.approx(69 / 12)
+        title = Title.objects.get(id=titles[1]['id'])
+        assert title.weighted_rating is None, (
+            'Проверьте, что у произведения без отзывов `weighted_rating` '
+            'равен `None`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_opt_in_fields(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        data = client.get('/api/v1/titles/').json()['results'][0]
+        assert not {'weighted_rating', 'score_histogram'} & set(data), (
+            'Проверьте, что новые поля отдаются только по `?include=`'
+        )
+        data = client.get(
+            '/api/v1/titles/', {'include': 'score_histogram'}
+        ).json()['results']
+        assert all(
+            'score_histogram' in title and 'weighted_rating' not in title
+            for title in data
+        )
+        data = client.get(
+            '/api/v1/genres/horror/titles/',
+            {'include': 'weighted_rating', 'ordering': '-weighted_rating'},
+        ).json()['results']
+        assert data[0]['weighted_rating'] == pytest.approx(67 / 13), (
+            'Проверьте сортировку рейтинга жанра по `weighted_rating`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rebuild(self, admin_client, admin):
+        from reviews.models import GenreRanking, Title
+
+        create_reviews(admin_client, admin)
+        expected = list(Title.objects.order_by('id').values_list(*COUNTERS))
+        Title.objects.update(
+            weighted_rating=7, **{field: 3 for field in HISTOGRAM_FIELDS}
+        )
+        call_command('rebuild_ratings')
+        assert list(
+            Title.objects.order_by('id').values_list(*COUNTERS)
+        ) == expected, (
+            'Проверьте, что `rebuild_ratings` пересчитывает гистограмму и '
+            '`weighted_rating` так же, как сигналы отзывов'
+        )
+        weighted = {
+            title_id: weighted_rating or 0
+            for title_id, weighted_rating
+            in Title.objects.values_list('id', 'weighted_rating')
+        }
+        assert all(
+            weighted[title_id] == weighted_rating
+            for title_id, weighted_rating
+            in GenreRanking.objects.values_list('title_id', 'weighted_rating')
+        ), 'Проверьте, что `weighted_rating` попадает в таблицы рейтингов'
@@ -0,0 +1,53 @@
+import pytest
+
+from .common import create_reviews, query_budget
+
+
+class Test26TitleStats:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_stats(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/stats/'
+        response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что `{url}` доступен без токена'
+        )
+        data = response.json()
+        assert (data['review_count'], data['mean'], data['median']) == (
+            3, 4, 4
+        ), 'Проверьте, что `stats` отдаёт число отзывов, среднюю и медиану'
+        assert data['histogram'] == {
+            str(score): int(score in (3, 4, 5)) for score in range(1, 11)
+        }, 'Проверьте гистограмму оценок в `stats`'
+
+        admin_client.delete(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/'
+        )
+        data = client.get(url).json()
+        assert (data['review_count'], data['median']) == (2, 4.5), (
+            'Проверьте, что `stats` обновляется после удаления отзыва и '
+            'медиана чётного числа оценок — среднее двух средних'
+        )
+
+        data = client.get(f'/api/v1/titles/{titles[1]["id"]}/stats/').json()
+        assert data['review_count'] == 0 and data['median'] is None
+        assert set(data['histogram'].values()) == {0}
+        assert client.get('/api/v1/titles/100500/stats/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_no_review_scan(self, client, admin_client, admin, settings):
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        }}
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/stats/'
+        # Версии ресурсов и счётчики произведения.
+        with query_budget(2, url) as context:
+            client.get(url)
+        assert not any(
+            'reviews_review' in query['sql']
+            for query in context.captured_queries
+        ), (
+            'Проверьте, что `stats` читает только счётчики произведения'
+        )
@@ -0,0 +1,101 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_reviews
+
+
+def get(client, url, params):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, params)
+    assert response.status_code == 200, (
+        f'Проверьте, что `{url}` принимает параметры {params}'
+    )
+    return response.json(), [query['sql'] for query in context]
+
+
+@pytest.fixture
+def no_response_cache(settings):
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+    }}
+
+
+@pytest.mark.usefixtures('no_response_cache')
+class Test27SparseFields:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_fields(self, client, admin_client, admin):
+        create_reviews(admin_client, admin)
+        data, queries = get(client, '/api/v1/titles/', {'fields': 'id,name'})
+        assert all(set(title) == {'id', 'name'} for title in data['results']), (
+            'Проверьте, что `?fields=` оставляет в ответе только '
+            'перечисленные поля'
+        )
+        assert len(queries) == 3 and not any(
+            'description' in sql or 'reviews_category' in sql
+            or 'reviews_genre' in sql for sql in queries
+        ), (
+            'Проверьте, что `?fields=` сужает запрос: описание, категория '
+            'и жанры не читаются из базы'
+        )
+
+        data, queries = get(
+            client, '/api/v1/titles/', {'fields': 'name,category'}
+        )
+        assert data['results'][0]['category'].keys() == {'name', 'slug'}, (
+            'Проверьте, что вложенные объекты отдаются целиком'
+        )
+
+        data, queries = get(
+            client, '/api/v1/titles/',
+            {'omit': 'description,genre', 'include': 'score_histogram'},
+        )
+        assert set(data['results'][0]) == {
+            'id', 'name', 'year', 'category', 'rating', 'score_histogram'
+        }, 'Проверьте, что `?omit=` убирает перечисленные поля'
+        assert not any(
+            'description' in sql or 'reviews_genre' in sql for sql in queries
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_and_retrieve(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        data, queries = get(client, url, {'omit': 'text'})
+        assert data['results'][0].keys() == {
+            'id', 'score', 'author', 'pub_date'
+        }
+        assert not any('"text"' in sql for sql in queries), (
+            'Проверьте, что текст отзыва не читается при `?omit=text`'
+        )
+        data, _ = get(
+            client, url, {'fields': 'id,author', 'pagination': 'cursor'}
+        )
+        assert data['results'][0].keys() == {'id', 'author'}
+
+        data, queries = get(
+            client, f'{url}{reviews[0]["id"]}/', {'fields': 'score'}
+        )
+        assert data == {'score': 5}, (
+            'Проверьте, что `?fields=` работает и для одного объекта'
+        )
+        title, _ = get(
+            client, f'/api/v1/titles/{titles[0]["id"]}/',
+            {'fields': 'name,weighted_rating'},
+        )
+        assert set(title) == {'name', 'weighted_rating'}, (
+            'Проверьте, что поля из `include` можно запросить через `fields`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_writes_ignore_fields(self, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        response = admin_client.post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/?fields=id',
+            data={'text': 'Отзыв', 'score': 7},
+        )
+        assert response.status_code == 201
+        assert {'id', 'text', 'score'} <= set(response.json()), (
+            'Проверьте, что `?fields=` не влияет на запись'
+        )
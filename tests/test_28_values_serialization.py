@@ -0,0 +1,69 @@
+from unittest import mock
+
+import pytest
+from django.test import Client
+
+from .common import create_comments
+
+
+@pytest.fixture
+def catalogue(admin_client, admin, settings):
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+    }}
+    comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+    # Произведение без категории и описания.
+    admin_client.post('/api/v1/titles/', data={
+        'name': 'Без категории', 'year': 1999, 'genre': ['drama'],
+        'category': 'books',
+    })
+    admin_client.delete('/api/v1/categories/books/')
+    title_id = titles[0]['id']
+    review_id = reviews[0]['id']
+    return [
+        '/api/v1/titles/',
+        '/api/v1/titles/?page_size=1&page=2',
+        '/api/v1/titles/?count=false&genre=drama',
+        '/api/v1/titles/?search=Поворот',
+        '/api/v1/titles/?fields=name,genre',
+        '/api/v1/titles/?omit=category&include=weighted_rating,'
+        'score_histogram',
+        f'/api/v1/titles/{title_id}/reviews/',
+        f'/api/v1/titles/{title_id}/reviews/?pagination=cursor&page_size=2',
+        f'/api/v1/titles/{title_id}/reviews/?omit=text',
+        f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+        f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+        f'?pagination=cursor&page_size=1&fields=id,author',
+    ]
+
+
+class Test28ValuesSerialization:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_identical_json(self, catalogue, settings):
+        from rest_framework.serializers import ListSerializer
+
+        client = Client()
+        urls = list(catalogue)
+        fast = {}
+        # Списки строятся без сериализации объектов.
+        with mock.patch.object(
+            ListSerializer, 'to_representation', side_effect=AssertionError
+        ):
+            while urls:
+                url = urls.pop()
+                response = client.get(url)
+                assert response.status_code == 200, (
+                    f'Проверьте, что `{url}` отдаётся по строкам .values()'
+                )
+                fast[url] = response.content
+                next_url = response.json().get('next')
+                if 'cursor' in url and next_url:
+                    urls.append(next_url.replace('http://testserver', ''))
+
+        settings.API_VALUES_SERIALIZATION = False
+        for url, content in fast.items():
+            assert client.get(url).content == content, (
+                f'Проверьте, что ответ `{url}` по строкам .values() '
+                'совпадает с ответом сериализатора побайтно'
+            )
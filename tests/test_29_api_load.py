@@ -0,0 +1,52 @@
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import pytest
+from django.urls import resolve
+
+
+class Test29ApiLoad:
+
+    def test_01_scenarios_cover_routes(self):
+        from benchmarks.api_load import missing_routes, scenarios
+
+        missing = missing_routes(scenarios(defaultdict(int), ''))
+        assert not missing, (
+            'Проверьте, что у каждого маршрута api/urls.py есть сценарий '
+            'нагрузочного прогона'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_scenarios_succeed(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from benchmarks.api_load import (
+            make_client, sample_objects, scenarios, seed, send
+        )
+        from reviews.models import User
+
+        seed(5, 0, 3, 100, log=lambda line: None)
+        admin = User.objects.create(
+            username='load-admin', email='load-admin@yamdb.fake',
+            role=User.ADMIN,
+        )
+        user, sample = sample_objects(admin)
+        tokens = {
+            'admin': str(AccessToken.for_user(admin)),
+            'user': str(AccessToken.for_user(user)),
+        }
+        for scenario in scenarios(sample, 'test'):
+            if scenario.prepare:
+                scenario.prepare(1)
+            url = scenario.url()
+            assert resolve(urlsplit(url).path).url_name == scenario.route
+            data = scenario.data() if scenario.data else None
+            response = send(
+                make_client(None, tokens.get(scenario.role)), None,
+                scenario.method, url, data,
+            )
+            expected = 400 if scenario.name == 'get_token' else 399
+            assert response.status_code <= expected, (
+                f'Сценарий {scenario.name}: {scenario.method.upper()} {url} '
+                f'вернул {response.status_code}'
+            )